@@ -0,0 +1,105 @@
+# aio.py
+# asyncio 接口：在事件循环中整理文件夹，以异步迭代器的形式产出进度事件。
+# 阻塞的文件系统操作在有上限的线程池中执行，同一个事件循环可以同时整理多个文件夹；
+# 取消协程所在的任务即停止整理，已开始的移动会完成，journal 和断点照常写入
+#
+#     engine = AsyncOrganizer(max_concurrent=4, dry_run=True)
+#     async for event in engine.organize("/data/upload", "config.json"):
+#         if event.kind == "progress": ...
+
+import asyncio
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from organizer import FileOrganizer
+
+# kind 为 "status"(value 为消息)、"progress"(value 为百分比) 或 "result"(value 为结果字典，最后一个事件)
+Event = namedtuple("Event", ["kind", "value"])
+
+# 整理结束的标记，只在队列内部使用
+_DONE = object()
+
+
+class AsyncOrganizer:
+    def __init__(self, max_concurrent=4, executor=None, **organizer_options):
+        """
+        max_concurrent: 同时运行的整理数，超过时在线程池中排队
+        executor: 使用已有的线程池，None 时创建 max_concurrent 个线程的线程池
+        organizer_options: 传给每个 FileOrganizer 的其他参数(dry_run、workers 等)
+        """
+        self.own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max(1, max_concurrent), thread_name_prefix="organize")
+        self.organizer_options = organizer_options
+
+    async def organize(self, folder, rules, target=None):
+        # 产出 Event，直到 "result" 事件；整理失败(规则无效、文件夹不存在等)时结果为None。
+        # 提前结束迭代时应使用 contextlib.aclosing，及时停止整理
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue()
+
+        def put(event):
+            loop.call_soon_threadsafe(events.put_nowait, event)
+
+        organizer = FileOrganizer(folder, rules, target_root=target, **self.organizer_options)
+        organizer.status_updated.connect(lambda message: put(Event("status", message)))
+        organizer.progress_updated.connect(lambda value: put(Event("progress", value)))
+
+        def run():
+            try:
+                if not organizer.isRunning:
+                    # 排队期间已被取消，不再开始整理
+                    return None
+                organizer.organize()
+            finally:
+                put(_DONE)
+            return organizer.result
+
+        future = loop.run_in_executor(self.executor, run)
+        try:
+            while True:
+                event = await events.get()
+                if event is _DONE:
+                    break
+                yield event
+            yield Event("result", await future)
+        finally:
+            if not future.done():
+                # 任务被取消或调用方提前结束迭代：通知整理停止，并等待线程结束(已开始的移动完成、journal 写入)；
+                # 尚未开始的整理在线程中直接返回
+                organizer.stop()
+                try:
+                    await asyncio.shield(future)
+                except Exception:
+                    pass
+
+    async def run(self, folder, rules, target=None, on_event=None):
+        # 整理一个文件夹并返回结果；on_event 接收中间的状态和进度事件
+        result = None
+        async for event in self.organize(folder, rules, target):
+            if event.kind == "result":
+                result = event.value
+            elif on_event is not None:
+                on_event(event)
+        return result
+
+    async def run_many(self, jobs, on_event=None):
+        """
+        同时整理多个文件夹，jobs 为 scheduler.Job 或 (文件夹, 规则文件[, 目标根目录]) 序列，按顺序返回各自的结果
+            on_event 的参数为 (任务序号, 事件)；整理失败的文件夹结果为None
+        """
+        async def one(index, job):
+            callback = None if on_event is None else (lambda event: on_event(index, event))
+            return await self.run(*job, on_event=callback)
+
+        return await asyncio.gather(*(one(index, job) for index, job in enumerate(jobs)))
+
+    def close(self):
+        if self.own_executor:
+            self.executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        # 等待线程池关闭时不阻塞事件循环
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -0,0 +1,70 @@
+# bench_pool.py
+# 多进程规划的扩展性：同一批合成记录分别用 1、2、4、8 个进程规划，规则包含大量关键词和按文件名日期分桶，
+# 对比每秒规划的文件数。进程数超过 CPU 数时没有收益
+# 用法: python benchmarks/bench_pool.py [--count 400000] [--processes 1 2 4 8]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from parallel import default_processes, iter_plan_parallel  # noqa: E402
+from rules import FileRecord, compile_rules  # noqa: E402
+
+KEYWORDS = [f"proj{i:04d}" for i in range(300)] + ["报告", "invoice", "backup"]
+
+RULES = {
+    "classification_rule": {
+        "priority": ["custom", "time", "default"],
+        "custom": {"enabled": True, "keyword": KEYWORDS},
+        "time": {"enabled": True, "bucket": "%Y/%m/%d", "date_source": ["filename", "mtime"],
+                 "start_time": 1300000000, "end_time": 1700000000},
+        "default": {"enabled": True, "images": True, "videos": True, "documents": True, "others": True},
+    },
+}
+
+EXTS = ['.jpg', '.log', '.csv', '.dat', '']
+
+
+def synthetic_records(count, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        ext = rng.choice(EXTS)
+        date = f"{rng.randint(2010, 2024)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}"
+        name = f"export_{date}_{rng.choice(['node', 'app', 'cam'])}{i}_{rng.randint(0, 10 ** 6)}{ext}"
+        records.append(FileRecord(name, ext, rng.randint(1, 10 ** 7), rng.uniform(1.2e9, 1.8e9),
+                                  f"/data/{name}", i + 1))
+    return records
+
+
+def run(label, planned_iter, count):
+    start = time.perf_counter()
+    moved = sum(1 for _, planned in planned_iter if planned is not None)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {elapsed:8.3f} s  {count / elapsed:10.0f} 文件/秒  需要移动 {moved}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程规划基准")
+    parser.add_argument("--count", type=int, default=400000, help="合成记录数量")
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4, 8], help="要测试的进程数")
+    parser.add_argument("--chunk", type=int, default=1024, help="每块的记录数")
+    args = parser.parse_args()
+
+    records = synthetic_records(args.count)
+    compiled = compile_rules(RULES)
+    print(f"可用 CPU: {default_processes()}")
+
+    baseline = run("单进程", ((record, compiled.plan(record)) for record in records), args.count)
+    for processes in args.processes:
+        elapsed = run(f"{processes} 个进程", iter_plan_parallel(records, compiled, processes, args.chunk), args.count)
+        print(f"{'':<10} 相对单进程: {baseline / elapsed:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# bench_reporter.py
+# 对比整理耗时：不连接界面 / 连接主界面(合并发送) / 连接主界面(每个文件都发送，即旧的行为)
+# 用法: python benchmarks/bench_reporter.py [--count 200000]
+# 没有显示器的服务器上可以设置 QT_QPA_PLATFORM=offscreen
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QThread  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from organizer import FileOrganizer  # noqa: E402
+from reporter import DEFAULT_INTERVAL  # noqa: E402
+from ui import MainWindow, OrganizerWorker  # noqa: E402
+
+EXTS = ['.jpg', '.mp4', '.txt', '.pdf', '.zip']
+
+RULES = {
+    "classification_rule": {
+        "priority": ["default"],
+        "default": {"enabled": True, "images": True, "videos": True, "documents": True, "others": True},
+    },
+    "filter_rule": {},
+}
+
+
+def make_folder(root, count):
+    os.makedirs(root)
+    for i in range(count):
+        with open(os.path.join(root, f"file_{i}{EXTS[i % len(EXTS)]}"), "wb"):
+            pass
+
+
+def run_headless(folder, rules_path, interval):
+    organizer = FileOrganizer(folder, rules_path)
+    organizer.report_interval = interval
+    start = time.perf_counter()
+    organizer.organize()
+    return time.perf_counter() - start
+
+
+def run_with_gui(app, folder, rules_path, interval):
+    # 与 MainWindow.start_organization 相同的线程和信号连接方式，但不弹出完成对话框
+    window = MainWindow()
+    window.show()
+    thread = QThread()
+    organizer = FileOrganizer(folder, rules_path)
+    organizer.report_interval = interval
+    worker = OrganizerWorker(organizer)
+    worker.moveToThread(thread)
+    thread.started.connect(worker.run)
+    worker.progress_updated.connect(window.update_progress)
+    worker.status_updated.connect(window.update_status)
+    worker.finished.connect(thread.quit)
+    thread.finished.connect(app.quit)
+
+    start = time.perf_counter()
+    thread.start()
+    app.exec()
+    # 界面处理完积压的信号才算结束
+    app.processEvents()
+    elapsed = time.perf_counter() - start
+    thread.wait()
+    window.close()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="进度信号合并的基准测试")
+    parser.add_argument("--count", type=int, default=200000, help="文件数量")
+    parser.add_argument("--dir", default=None, help="生成测试文件的位置，默认为系统临时目录")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    base = tempfile.mkdtemp(dir=args.dir)
+    rules_path = os.path.join(base, "config.json")
+    with open(rules_path, "w", encoding="utf-8") as f:
+        json.dump(RULES, f)
+
+    cases = [
+        ("无界面", lambda folder: run_headless(folder, rules_path, DEFAULT_INTERVAL)),
+        ("界面+合并", lambda folder: run_with_gui(app, folder, rules_path, DEFAULT_INTERVAL)),
+        ("界面+逐个", lambda folder: run_with_gui(app, folder, rules_path, 0)),
+    ]
+    try:
+        for index, (label, run) in enumerate(cases):
+            folder = os.path.join(base, f"case_{index}")
+            make_folder(folder, args.count)
+            elapsed = run(folder)
+            print(f"{label:<8} {elapsed:8.2f} s  {args.count / elapsed:10.0f} 文件/秒")
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
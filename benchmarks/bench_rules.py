@@ -0,0 +1,132 @@
+# bench_rules.py
+# 规则判定的微基准：对比逐个文件查字典、解析规则(旧实现)和编译后的判定流水线的单文件耗时
+# 用法: python benchmarks/bench_rules.py [--count 1000000]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rules import FileRecord, compile_rules  # noqa: E402
+
+RULES = {
+    "classification_rule": {
+        "priority": ["custom", "size", "time", "default"],
+        "custom": {"enabled": True, "keyword": ["报告", "invoice", "PRJ-0042", ".psd", ".blend"]},
+        "size": {"enabled": True, "model": "介于", "value1": 50, "value2": 500},
+        "time": {"enabled": True, "start_time": 1600000000, "end_time": 1650000000},
+        "default": {"enabled": True, "images": True, "videos": True, "documents": True, "others": True},
+    },
+    "filter_rule": {
+        "size": {"enabled": True, "model": "大于", "value1": 0, "value2": 0},
+        "time": {"enabled": True, "start_time": 1500000000, "end_time": 1800000000},
+    },
+}
+
+EXTS = ['.jpg', '.png', '.mp4', '.txt', '.pdf', '.docx', '.psd', '.zip', '.log', '']
+WORDS = ['photo', 'scan', 'invoice', '报告', 'backup', 'IMG', 'PRJ-0042', 'data', 'notes']
+
+
+def synthetic_records(count, seed=0):
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        ext = rng.choice(EXTS)
+        name = f"{rng.choice(WORDS)}_{i}{ext}"
+        size = int(rng.lognormvariate(12, 3))
+        mtime = rng.uniform(1500000000, 1800000000)
+        records.append(FileRecord(name, ext, size, mtime))
+    return records
+
+
+def legacy_plan(rules, record):
+    # 旧实现：每个文件都重新遍历规则字典、拆分文件名、转换数值
+    classification_rules = rules.get("classification_rule", {})
+    filter_rules = rules.get("filter_rule", {})
+    time_filter = filter_rules.get("time", {})
+    if time_filter.get("enabled"):
+        start_time = time_filter.get("start_time")
+        end_time = time_filter.get("end_time")
+        if not start_time or not end_time or not start_time <= record.mtime <= end_time:
+            return None
+    size_filter = filter_rules.get("size", {})
+    if size_filter.get("enabled"):
+        file_size = record.size / (1024 * 1024)
+        model = size_filter.get("model")
+        value1 = float(size_filter.get("value1"))
+        value2 = float(size_filter.get("value2"))
+        if not ((model == "大于" and file_size > value1) or (model == "小于" and file_size < value2)
+                or (model == "介于" and value1 < file_size < value2)):
+            return None
+
+    for rule_type in classification_rules.get("priority", []):
+        rule_details = classification_rules.get(rule_type, {})
+        if not rule_details.get("enabled"):
+            continue
+        if rule_type == "custom":
+            name, ext = os.path.splitext(record.name)
+            for item in rule_details.get("keyword", []):
+                if (item.startswith('.') and item == ext) or (not item.startswith('.') and item in name):
+                    return rule_type, f'拓展名为{item}的文件' if item.startswith('.') else f'文件名中存在{item}的文件'
+        elif rule_type == "size":
+            file_size = record.size / (1024 * 1024)
+            model = rule_details.get("model")
+            value1 = rule_details.get("value1")
+            value2 = rule_details.get("value2")
+            if ((model == "大于" and file_size > value1) or (model == "小于" and file_size < value2)
+                    or (model == "介于" and value1 < file_size < value2)):
+                return rule_type, '按大小分类的文件'
+        elif rule_type == "time":
+            if rule_details.get("start_time") < record.mtime < rule_details.get("end_time"):
+                return rule_type, '按时间分类的文件'
+        elif rule_type == "default":
+            ext = os.path.splitext(record.name)[1].lower()
+            if rule_details.get("images") and ext in ['.jpg', '.png', '.gif', '.jpeg', '.bmp', '.svg']:
+                return rule_type, "图片"
+            if rule_details.get("videos") and ext in ['.mp4', '.mov', '.avi', '.mkv', '.wmv']:
+                return rule_type, "视频"
+            if rule_details.get("documents") and ext in ['.txt', '.doc', '.docx', '.rtf', '.xlsx', '.xls', '.ppt',
+                                                         '.pptx', '.pdf']:
+                return rule_type, "文档"
+            if rule_details.get("others"):
+                all_known_exts = {
+                    '.jpg', '.png', '.gif', '.jpeg', '.bmp', '.svg',
+                    '.mp4', '.mov', '.avi', '.mkv', '.wmv',
+                    '.txt', '.doc', '.docx', '.rtf', '.xlsx', '.xls', '.ppt', '.pptx', '.pdf'
+                }
+                if ext not in all_known_exts:
+                    return rule_type, "其他"
+    return None
+
+
+def run(label, plan, records):
+    start = time.perf_counter()
+    for record in records:
+        plan(record)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<8} {elapsed:8.3f} s  {elapsed / len(records) * 1e9:8.1f} ns/文件")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="规则判定微基准")
+    parser.add_argument("--count", type=int, default=1000000, help="合成文件名数量")
+    args = parser.parse_args()
+
+    records = synthetic_records(args.count)
+    compiled = compile_rules(RULES)
+
+    # 两种实现的结果必须一致
+    for record in records[:10000]:
+        assert legacy_plan(RULES, record) == compiled.plan(record), record
+
+    legacy = run("旧实现", lambda record: legacy_plan(RULES, record), records)
+    fast = run("编译后", compiled.plan, records)
+    print(f"加速比: {legacy / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+# bench_suite.py
+# 整理性能的基准套件：用 synthetic.py 生成合成文件夹，在多组规则下完整运行 FileOrganizer.organize，
+# 输出每秒文件数、每个文件的系统调用数、峰值内存和耗时，结果可以保存为 JSON，与其他版本的结果对比。
+# 每次运行都在单独的子进程中进行，峰值内存互不影响；计时运行和统计系统调用的运行分开，统计本身不影响耗时。
+# 系统调用数：有 strace 时为整个子进程的系统调用数减去只启动解释器的次数；
+# 否则使用 Python 审计事件统计文件系统调用(open、scandir、rename、mkdir 等，不包括 stat 和 fsync)，只作为下限
+# 用法: python benchmarks/bench_suite.py [--count 20000] [--presets default keywords] [--rules config.json]
+#       [--base /dev/shm] [--output results.json] [--compare baseline.json]
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from synthetic import add_arguments, generate  # noqa: E402
+
+DEFAULT_CLASSIFICATION = {"enabled": True, "images": True, "videos": True, "documents": True, "others": True}
+
+# 内置的规则组合，名称 -> 规则
+RULE_PRESETS = {
+    "default": {
+        "classification_rule": {"priority": ["default"], "default": DEFAULT_CLASSIFICATION},
+    },
+    "keywords": {
+        "classification_rule": {
+            "priority": ["custom", "default"],
+            "custom": {"enabled": True, "keyword": [f"proj{i:04d}" for i in range(300)] + ["报告", "invoice"]},
+            "default": DEFAULT_CLASSIFICATION,
+        },
+    },
+    "time_bucket": {
+        "classification_rule": {
+            "priority": ["time", "default"],
+            "time": {"enabled": True, "bucket": "%Y/%m", "date_source": ["filename", "mtime"]},
+            "default": DEFAULT_CLASSIFICATION,
+        },
+    },
+    "filters": {
+        "classification_rule": {"priority": ["size", "default"],
+                                "size": {"enabled": True, "model": "大于", "value1": 1, "value2": 0},
+                                "default": DEFAULT_CLASSIFICATION},
+        "filter_rule": {"time": {"enabled": True, "start_time": 1451606400, "end_time": 1704067200}},
+    },
+    "recursive_workers": {
+        "classification_rule": {"priority": ["default"], "default": DEFAULT_CLASSIFICATION},
+        "scan": {"recursive": True, "max_depth": None},
+        "execution": {"workers": 8},
+    },
+}
+
+
+# ---- 子进程：运行一次整理并以 JSON 输出测量结果 ----
+
+def fs_event(event):
+    return event.startswith("os.") or event in ("open", "ctypes.call_function")
+
+
+def child(folder, rules_path, count_calls):
+    from organizer import FileOrganizer
+
+    calls = Counter()
+    active = False
+
+    def audit(event, args):
+        if active and fs_event(event):
+            calls[event] += 1
+
+    if count_calls:
+        sys.addaudithook(audit)
+        # 通过 ctypes 调用的 renameat2 不产生审计事件，单独计数
+        import fileops
+        if fileops._renameat2 is not None:
+            renameat2 = fileops._renameat2
+
+            def counted_renameat2(*args):
+                if active:
+                    calls["renameat2"] += 1
+                return renameat2(*args)
+
+            fileops._renameat2 = counted_renameat2
+    organizer = FileOrganizer(folder, rules_path)
+    active = True
+    start = time.perf_counter()
+    organizer.organize()
+    elapsed = time.perf_counter() - start
+    active = False
+    print(json.dumps({"elapsed": elapsed, "result": organizer.result, "peak_rss_kb": peak_rss_kb(),
+                      "audited_calls": dict(calls) if count_calls else None}))
+
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 上以字节为单位
+    return maxrss // 1024 if sys.platform == "darwin" else maxrss
+
+
+# ---- 主进程 ----
+
+def run_child(folder, rules_path, count_calls=False, strace_out=None):
+    command = [sys.executable, os.path.abspath(__file__), "--child", folder, rules_path]
+    if count_calls:
+        command.append("--count-calls")
+    if strace_out is not None:
+        command = ["strace", "-f", "-c", "-o", strace_out] + command
+    output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=REPO_DIR).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def strace_total(path):
+    # strace -c 的汇总表中各系统调用的次数之和
+    total = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 5 and parts[0][0].isdigit() and parts[-1] != "total":
+                total += int(parts[3])
+    return total
+
+
+def strace_startup(base):
+    # 只启动解释器并导入 organizer 的系统调用数
+    out = os.path.join(base, "startup.strace")
+    subprocess.run(["strace", "-f", "-c", "-o", out, sys.executable, "-c", "import organizer"],
+                   check=True, capture_output=True, cwd=REPO_DIR)
+    return strace_total(out)
+
+
+def count_syscalls(base, tree_args, rules_path, use_strace, startup):
+    folder = fresh_tree(base, tree_args)
+    try:
+        if use_strace:
+            out = os.path.join(base, "run.strace")
+            run_child(folder, rules_path, strace_out=out)
+            return "strace", max(0, strace_total(out) - startup), None
+        audited = run_child(folder, rules_path, count_calls=True)["audited_calls"]
+        return "audit", sum(audited.values()), audited
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def fresh_tree(base, tree_args):
+    folder = tempfile.mkdtemp(prefix="tree_", dir=base)
+    generate(folder, tree_args.count, tree_args.sizes, tree_args.exts, tree_args.names, tree_args.depth,
+             tree_args.fanout, tree_args.seed)
+    return folder
+
+
+def load_configs(args):
+    # [(名称, 规则)]：选中的内置组合和 --rules 指定的规则文件
+    configs = []
+    for name in args.presets:
+        if name not in RULE_PRESETS:
+            raise SystemExit(f"未知的规则组合 '{name}'，可选: {', '.join(RULE_PRESETS)}")
+        configs.append((name, RULE_PRESETS[name]))
+    for path in args.rules:
+        with open(path, encoding="utf-8") as f:
+            configs.append((os.path.basename(path), json.load(f)))
+    return configs
+
+
+def git_version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], check=True, capture_output=True,
+                              text=True, cwd=REPO_DIR).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def default_base():
+    # 优先使用 tmpfs，测量的是整理本身而不是磁盘
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+def benchmark(args):
+    base = tempfile.mkdtemp(prefix="bench_suite_", dir=args.base)
+    use_strace = not args.no_syscalls and shutil.which("strace") is not None
+    try:
+        startup = strace_startup(base) if use_strace else 0
+        results = []
+        for name, rules in load_configs(args):
+            rules_path = os.path.join(base, "rules.json")
+            with open(rules_path, "w", encoding="utf-8") as f:
+                json.dump(rules, f, ensure_ascii=False)
+
+            runs = []
+            for _ in range(args.repeat):
+                folder = fresh_tree(base, args)
+                try:
+                    runs.append(run_child(folder, rules_path))
+                finally:
+                    shutil.rmtree(folder, ignore_errors=True)
+            best = min(runs, key=lambda run: run["elapsed"])
+            # 不递归的规则只处理根文件夹中的文件，按实际处理的文件数计算
+            files = (best["result"] or {}).get("processed", 0)
+            entry = {
+                "config": name,
+                "files": files,
+                "wall_time": round(best["elapsed"], 4),
+                "wall_times": [round(run["elapsed"], 4) for run in runs],
+                "files_per_second": round(files / best["elapsed"], 1) if best["elapsed"] > 0 else None,
+                "peak_rss_kb": max((run["peak_rss_kb"] or 0) for run in runs) or None,
+                "result": best["result"],
+            }
+            if not args.no_syscalls:
+                method, calls, detail = count_syscalls(base, args, rules_path, use_strace, startup)
+                entry.update({"syscall_method": method, "syscalls": calls,
+                              "syscalls_per_file": round(calls / files, 2) if files else None})
+                if detail is not None:
+                    entry["audited_calls"] = detail
+            results.append(entry)
+            print_entry(entry)
+        return results
+    finally:
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def print_entry(entry):
+    calls = f"{entry['syscalls_per_file']:7.2f} 调用/文件({entry['syscall_method']})" if "syscalls" in entry else ""
+    rss = f"{entry['peak_rss_kb'] / 1024:7.1f} MB" if entry["peak_rss_kb"] else "      -"
+    print(f"{entry['config']:<20} {entry['wall_time']:8.3f} s  {entry['files_per_second'] or 0:10.0f} 文件/秒  "
+          f"峰值内存 {rss}  {calls}", flush=True)
+
+
+def compare(results, baseline_path):
+    # 与之前保存的结果对比，同名的规则组合逐项比较
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {entry["config"]: entry for entry in baseline["results"]}
+    print(f"\n对比 {baseline_path} (版本 {baseline.get('version')})")
+    for entry in results:
+        previous = old.get(entry["config"])
+        if previous is None or not previous.get("files_per_second") or not entry["files_per_second"]:
+            continue
+        line = f"{entry['config']:<20} 速度 {entry['files_per_second'] / previous['files_per_second']:.2f}x"
+        if entry.get("syscalls_per_file") is not None and previous.get("syscalls_per_file") is not None \
+                and entry.get("syscall_method") == previous.get("syscall_method"):
+            line += f"  调用/文件 {previous['syscalls_per_file']:.2f} -> {entry['syscalls_per_file']:.2f}"
+        if entry["peak_rss_kb"] and previous.get("peak_rss_kb"):
+            line += f"  峰值内存 {entry['peak_rss_kb'] / previous['peak_rss_kb']:.2f}x"
+        print(line)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == "--child":
+        child(sys.argv[2], sys.argv[3], "--count-calls" in sys.argv[4:])
+        return
+
+    parser = argparse.ArgumentParser(description="整理性能基准套件")
+    add_arguments(parser)
+    parser.add_argument("--presets", nargs="*", default=list(RULE_PRESETS),
+                        help=f"内置的规则组合: {', '.join(RULE_PRESETS)}")
+    default_rules = [path for path in [os.path.join(os.getcwd(), "config.json")] if os.path.isfile(path)]
+    parser.add_argument("--rules", nargs="*", default=default_rules,
+                        help="其他规则文件(config.json 格式)，默认包括当前目录下的 config.json")
+    parser.add_argument("--repeat", type=int, default=3, help="每组规则的重复次数，取最短耗时")
+    parser.add_argument("--base", default=default_base(), help="生成文件夹的位置，默认为 /dev/shm")
+    parser.add_argument("--no-syscalls", action="store_true", help="不统计系统调用")
+    parser.add_argument("--output", default=None, help="把结果保存为 JSON 文件")
+    parser.add_argument("--compare", default=None, help="与之前保存的 JSON 结果对比")
+    args = parser.parse_args()
+    args.count = max(1, args.count)
+
+    tree = {key: getattr(args, key) for key in ("count", "sizes", "exts", "names", "depth", "fanout", "seed")}
+    print(f"版本 {git_version()}，{args.count} 个文件，位于 {args.base}", flush=True)
+    results = benchmark(args)
+    report = {
+        "version": git_version(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "base": args.base,
+        "tree": tree,
+        "repeat": args.repeat,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# synthetic.py
+# 生成用于基准测试的合成文件夹：文件数量、大小分布、拓展名比例、文件名模式和子文件夹层数都可以设置，
+# 同一组参数和种子每次生成相同的文件夹
+# 用法: python benchmarks/synthetic.py 文件夹 [--count 10000] [--sizes lognormal:8,2] [--exts jpg=5,txt=2]
+#       [--names "IMG_{date}_{n}"] [--depth 2] [--fanout 4] [--seed 0]
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# 拓展名=权重，none 为没有拓展名
+DEFAULT_EXTS = "jpg=6,png=2,mp4=1,mov=1,pdf=2,docx=1,txt=3,xlsx=1,zip=1,log=2,dat=1,none=1"
+# {n} 序号，{date} 日期(20230514)，{word} 常见词，{rand} 随机十六进制
+DEFAULT_NAMES = ["IMG_{date}_{n}", "{word}_{n}", "{word}-{date}-{rand}", "报告{n}", "scan{rand}"]
+WORDS = ["photo", "invoice", "backup", "notes", "data", "report", "export", "draft", "报告", "会议记录"]
+DEFAULT_SIZES = "lognormal:8,2"
+# 文件大小上限，避免对数正态分布偶尔生成过大的文件
+MAX_SIZE = 64 * 1024 * 1024
+# 修改时间的范围：2015-01-01 到 2024-12-31
+MTIME_RANGE = (1420070400, 1735603200)
+
+
+def parse_exts(text):
+    # "jpg=5,txt=2" -> ([".jpg", ".txt"], [5.0, 2.0])
+    exts, weights = [], []
+    for item in text.split(","):
+        ext, _, weight = item.strip().partition("=")
+        exts.append("" if ext == "none" else "." + ext.lstrip("."))
+        weights.append(float(weight or 1))
+    return exts, weights
+
+
+def size_sampler(text, max_size=MAX_SIZE):
+    # fixed:N | uniform:A-B | lognormal:MU,SIGMA (以字节为单位，lognormal 的参数为 ln(字节数) 的均值和标准差)
+    kind, _, params = text.partition(":")
+    if kind == "fixed":
+        size = int(params)
+        return lambda rng: size
+    if kind == "uniform":
+        low, high = (int(value) for value in params.split("-"))
+        return lambda rng: rng.randint(low, high)
+    if kind == "lognormal":
+        mu, sigma = (float(value) for value in params.split(","))
+        return lambda rng: min(int(rng.lognormvariate(mu, sigma)), max_size)
+    raise ValueError(f"未知的大小分布 '{text}'")
+
+
+def sub_folders(folder, depth, fanout):
+    # 全部层数的子文件夹(包括根文件夹本身)，文件平均分布在其中
+    folders = [folder]
+    level = [folder]
+    for d in range(depth):
+        level = [os.path.join(parent, f"dir{d}_{i}") for parent in level for i in range(fanout)]
+        folders += level
+    return folders
+
+
+def generate(folder, count=10000, sizes=DEFAULT_SIZES, exts=DEFAULT_EXTS, names=None, depth=0, fanout=4,
+             seed=0):
+    # 返回 {"files", "bytes", "folders"}
+    rng = random.Random(seed)
+    ext_list, weights = parse_exts(exts)
+    sample_size = size_sampler(sizes)
+    names = names or DEFAULT_NAMES
+    folders = sub_folders(folder, depth, fanout)
+    for path in folders:
+        os.makedirs(path, exist_ok=True)
+
+    total_bytes = 0
+    for n in range(count):
+        mtime = rng.uniform(*MTIME_RANGE)
+        date = time.strftime("%Y%m%d", time.localtime(mtime))
+        name = rng.choice(names).format(n=n, date=date, word=rng.choice(WORDS), rand=f"{rng.getrandbits(32):08x}")
+        name += rng.choices(ext_list, weights)[0]
+        path = os.path.join(rng.choice(folders), name)
+        size = sample_size(rng)
+        with open(path, "wb") as f:
+            if size:
+                # 随机内容，查找重复文件时不会把所有文件都当作相同
+                f.write(rng.randbytes(size))
+        os.utime(path, (mtime, mtime))
+        total_bytes += size
+    return {"files": count, "bytes": total_bytes, "folders": len(folders)}
+
+
+def add_arguments(parser):
+    parser.add_argument("--count", type=int, default=10000, help="文件数量")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="大小分布: fixed:N、uniform:A-B 或 lognormal:MU,SIGMA")
+    parser.add_argument("--exts", default=DEFAULT_EXTS, help="拓展名比例，例如 jpg=5,txt=2,none=1")
+    parser.add_argument("--names", nargs="+", default=None,
+                        help="文件名模式，可以使用 {n} {date} {word} {rand}")
+    parser.add_argument("--depth", type=int, default=0, help="子文件夹层数，0 为全部文件在同一文件夹中")
+    parser.add_argument("--fanout", type=int, default=4, help="每层的子文件夹数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成合成文件夹")
+    parser.add_argument("folder", help="要生成的文件夹")
+    add_arguments(parser)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    summary = generate(args.folder, args.count, args.sizes, args.exts, args.names, args.depth, args.fanout,
+                       args.seed)
+    print(f"生成 {summary['files']} 个文件，{summary['bytes'] / (1024 * 1024):.1f} MB，"
+          f"{summary['folders']} 个文件夹，耗时 {time.perf_counter() - start:.2f} s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
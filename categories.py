@@ -0,0 +1,82 @@
+# categories.py
+# 预设分类表：每个分类有配置键、文件夹名和拓展名。编译规则时只构建一次 拓展名 -> 文件夹名 的字典
+# (拓展名预先转成小写)，分类判断和创建文件夹都使用同一张表。
+# 规则文件中的 "categories" 可以新增分类或为已有分类追加拓展名:
+#     "categories": {"ebooks": {"folder": "电子书", "exts": [".epub", ".mobi"]}, "images": {"exts": [".heic"]}}
+
+# 配置键, 文件夹名, 拓展名；同一拓展名出现在多个分类中时以靠前的启用分类为准
+BUILTIN_CATEGORIES = (
+    ("images", "图片", ('.jpg', '.png', '.gif', '.jpeg', '.bmp', '.svg')),
+    ("videos", "视频", ('.mp4', '.mov', '.avi', '.mkv', '.wmv')),
+    ("documents", "文档", ('.txt', '.doc', '.docx', '.rtf', '.xlsx', '.xls', '.ppt', '.pptx', '.pdf')),
+    ("audio", "音频", ('.mp3', '.wav', '.flac', '.aac', '.ogg', '.m4a', '.wma', '.opus')),
+    ("archives", "压缩包", ('.zip', '.rar', '.7z', '.tar', '.gz', '.tgz', '.bz2', '.xz', '.zst')),
+    ("code", "代码", ('.py', '.js', '.ts', '.java', '.c', '.cpp', '.h', '.hpp', '.cs', '.go', '.rs', '.rb',
+                      '.php', '.sh', '.swift', '.kt')),
+    ("raw", "RAW照片", ('.cr2', '.cr3', '.nef', '.arw', '.dng', '.raf', '.orf', '.rw2')),
+    ("cad", "CAD图纸", ('.dwg', '.dxf', '.step', '.stp', '.iges', '.igs', '.stl')),
+)
+OTHERS_FOLDER = "其他"
+
+# 最初的三个预设分类：即使配置中没有对应的键，其拓展名也不会归入"其他"。
+# 后来加入的分类只有在配置中出现时才生效，旧的配置文件整理结果不变
+BASE_KEYS = ("images", "videos", "documents")
+
+
+class CategoryRegistry:
+    def __init__(self, categories=BUILTIN_CATEGORIES):
+        # 分类键 -> (文件夹名, 拓展名元组)，保持定义顺序
+        self.categories = {}
+        # 用户在规则文件中新增的分类，未在 default 中关闭时默认启用
+        self.user_keys = set()
+        for key, folder, exts in categories:
+            self.categories[key] = (folder, tuple(ext.lower() for ext in exts))
+
+    @classmethod
+    def from_rules(cls, rules, warn=None):
+        registry = cls()
+        for key, details in rules.get("categories", {}).items():
+            if key == "others" or not isinstance(details, dict):
+                if warn is not None:
+                    warn(f"分类 '{key}' 的定义无效，已忽略")
+                continue
+            exts = details.get("exts", [])
+            if isinstance(exts, str) or not all(isinstance(ext, str) for ext in exts):
+                if warn is not None:
+                    warn(f"分类 '{key}' 的拓展名无效，已忽略")
+                continue
+            exts = tuple(ext.lower() if ext.startswith('.') else '.' + ext.lower() for ext in exts)
+            if key in registry.categories:
+                folder, old_exts = registry.categories[key]
+                registry.categories[key] = (details.get("folder") or folder, old_exts + exts)
+            else:
+                registry.categories[key] = (details.get("folder") or key, exts)
+                registry.user_keys.add(key)
+        return registry
+
+    def folder(self, key):
+        return self.categories[key][0]
+
+    def is_enabled(self, key, default_rule):
+        return bool(default_rule.get(key, key in self.user_keys))
+
+    def is_known(self, key, default_rule):
+        # 拓展名是否视为已知(不归入"其他")
+        return key in BASE_KEYS or key in self.user_keys or key in default_rule
+
+    def enabled_folders(self, default_rule):
+        # 按定义顺序返回启用的分类 (分类键, 文件夹名)
+        return [(key, folder) for key, (folder, _) in self.categories.items() if self.is_enabled(key, default_rule)]
+
+    def ext_map(self, default_rule):
+        # 拓展名 -> 文件夹名，已知但未启用的分类对应None；同一拓展名以靠前的启用分类为准
+        result = {}
+        for key, (folder, exts) in self.categories.items():
+            if self.is_enabled(key, default_rule):
+                for ext in exts:
+                    result.setdefault(ext, folder)
+        for key, (folder, exts) in self.categories.items():
+            if self.is_known(key, default_rule):
+                for ext in exts:
+                    result.setdefault(ext, None)
+        return result
@@ -0,0 +1,74 @@
+# checkpoint.py
+# 断点续传：整理过程中定期保存 (已处理到的位置, 计数器, 规则哈希, 移动记录文件)，
+# 程序被关闭或机器重启后，下次整理从该位置继续，之前已处理过的文件不再重新判断。
+# 位置依赖按文件名排序的遍历顺序：先处理文件夹中的文件，再依次进入子文件夹
+
+import hashlib
+import json
+import os
+import time
+
+
+def rules_hash(rules):
+    # 规则内容的哈希，规则改变后旧的断点不再有效
+    text = json.dumps(rules, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def source_digest(source):
+    # 同一目标文件夹可能对应多个源文件夹，状态文件名中带上源路径的哈希
+    return hashlib.sha1(os.path.normcase(os.path.abspath(source)).encode("utf-8")).hexdigest()[:12]
+
+
+def dir_position(parts):
+    # 文件夹在遍历顺序中的位置，子文件夹排在本文件夹中所有文件之后
+    return [[1, part] for part in parts]
+
+
+def file_position(root, path):
+    # 文件在遍历顺序中的位置，可以直接比较大小
+    relative = os.path.relpath(path, root)
+    parts = relative.split(os.sep)
+    return dir_position(parts[:-1]) + [[0, parts[-1]]]
+
+
+class Checkpoint:
+    def __init__(self, folder, source, rules_digest):
+        self.source = os.path.abspath(source)
+        self.rules_digest = rules_digest
+        self.path = os.path.join(folder, f"checkpoint-{source_digest(source)}.json")
+
+    def load(self):
+        # 返回有效的断点数据，没有断点、断点损坏或规则已改变时返回None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if data.get("source") != self.source or data.get("rules_hash") != self.rules_digest:
+            return None
+        return data
+
+    def save(self, position, counters, journal):
+        data = {
+            "source": self.source,
+            "rules_hash": self.rules_digest,
+            "position": position,
+            "counters": counters,
+            "journal": journal,
+            "time": time.time(),
+        }
+        # 先写临时文件再替换，保证断点文件总是完整的
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
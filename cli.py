@@ -0,0 +1,144 @@
+# cli.py
+# 命令行入口，不导入 PySide6，可在没有图形界面的服务器上由 cron 定时运行
+# 用法: python -m cli 文件夹 [--rules config.json] [--dry-run] [--workers 8] [--json]
+#       python -m cli 文件夹 --dry-run --plan plan.jsonl   只导出移动计划
+#       python -m cli --apply plan.jsonl [--workers 8]     应用导出的计划
+#       python -m cli --undo 记录文件或目标文件夹 [--workers 8]  撤销一次整理
+#       python -m cli 文件夹 --watch                        持续整理新出现的文件，Ctrl+C 停止
+#       python -m cli --jobs jobs.json                      批量整理多个文件夹
+#       python -m cli 文件夹 --metrics [--metrics-file x.prom] 输出各阶段的耗时，可写成 Prometheus 格式
+
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+
+from journal import latest_journal
+from organizer import FileOrganizer
+from scheduler import Job, JobScheduler
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="按规则整理文件夹中的文件")
+    parser.add_argument("folder", nargs="?", help="要整理的文件夹")
+    parser.add_argument("--rules", default=os.path.join(os.getcwd(), "config.json"),
+                        help="规则文件，默认为当前目录下的 config.json")
+    parser.add_argument("--dry-run", action="store_true", help="只规划不移动文件")
+    parser.add_argument("--workers", type=int, default=None, help="并发移动的线程数")
+    parser.add_argument("--processes", default=None,
+                        help="规划文件的进程数，auto 为全部 CPU；较重的规则(按文件头识别、EXIF 日期)下使用")
+    parser.add_argument("--target", default=None, help="分类文件夹所在的根目录，默认为要整理的文件夹")
+    parser.add_argument("--plan", default=None, help="把移动计划写入该文件(.jsonl 或 .csv)")
+    parser.add_argument("--apply", default=None, metavar="PLAN", help="应用之前导出的移动计划，不再扫描文件夹")
+    parser.add_argument("--undo", default=None, metavar="JOURNAL",
+                        help="按移动记录撤销一次整理；指定目标文件夹时撤销最近一次")
+    parser.add_argument("--checkpoint", action="store_true", default=None,
+                        help="定期保存断点，中断后再次运行时从断点继续")
+    parser.add_argument("--incremental", action="store_true", default=None,
+                        help="使用本地索引，只处理上次整理后新增或变化的文件")
+    parser.add_argument("--durability", choices=["fast", "batched", "strict"], default=None,
+                        help="移动结果写入磁盘的方式，默认使用规则文件中的设置")
+    parser.add_argument("--watch", action="store_true", help="持续监视文件夹，自动整理新出现的文件")
+    parser.add_argument("--jobs", default=None, metavar="JOBS",
+                        help="批量任务文件: {\"workers\": 4, \"per_device\": 1, \"device_limits\": {路径: 上限}, "
+                             "\"jobs\": [{\"folder\": ..., \"rules\": ..., \"target\": ...}]}")
+    parser.add_argument("--metrics", action="store_true", default=None,
+                        help="记录各阶段(列出文件夹、stat、筛选、分类、mkdir、改名)的次数和耗时分布")
+    parser.add_argument("--metrics-file", default=None, metavar="PROM",
+                        help="把耗时指标写成 Prometheus 文本格式，供 node_exporter 的 textfile 收集器读取")
+    parser.add_argument("--json", action="store_true", help="以 JSON 格式输出结果")
+    parser.add_argument("--quiet", action="store_true", help="不输出整理过程中的状态")
+    return parser
+
+
+def run(args):
+    organizer = FileOrganizer(args.folder, args.rules, workers=args.workers, target_root=args.target,
+                              dry_run=args.dry_run, plan_path=args.plan, checkpoint=args.checkpoint,
+                              incremental=args.incremental, durability=args.durability,
+                              processes=args.processes, metrics=True if args.metrics_file else args.metrics,
+                              metrics_path=args.metrics_file)
+    messages = []
+    organizer.status_updated.connect(messages.append)
+    if not args.quiet:
+        organizer.status_updated.connect(lambda message: print(message, file=sys.stderr, flush=True))
+
+    start = time.perf_counter()
+    if args.undo:
+        journal_path = args.undo
+        if os.path.isdir(journal_path):
+            journal_path = latest_journal(journal_path) or journal_path
+        organizer.undo(journal_path)
+    elif args.apply:
+        organizer.apply_plan(args.apply)
+    elif args.watch:
+        # Ctrl+C 或 kill 时正常停止，写完移动记录再退出
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: organizer.stop())
+        organizer.watch()
+    else:
+        organizer.organize()
+    elapsed = time.perf_counter() - start
+    if organizer.metrics is not None and not args.json and not args.quiet:
+        print(organizer.metrics.format_report(), file=sys.stderr, flush=True)
+
+    output = {
+        "folder": args.folder,
+        "dry_run": args.dry_run,
+        "ok": organizer.result is not None,
+        "status": messages[-1] if messages else "",
+        "elapsed": round(elapsed, 3),
+    }
+    if organizer.result is not None:
+        output.update(organizer.result)
+    return output
+
+
+def run_jobs(args):
+    with open(args.jobs, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    jobs = [Job(item["folder"], item.get("rules", args.rules), item.get("target", args.target))
+            for item in config.get("jobs", [])]
+    scheduler = JobScheduler(jobs, workers=int(config.get("workers", 4)), per_device=int(config.get("per_device", 1)),
+                             device_limits=config.get("device_limits"),
+                             organizer_options={"workers": args.workers, "dry_run": args.dry_run,
+                                                "durability": args.durability, "processes": args.processes,
+                                                "metrics": args.metrics})
+    if not args.quiet:
+        scheduler.status_updated.connect(
+            lambda index, message: print(f"[{jobs[index].folder}] {message}", file=sys.stderr, flush=True))
+        scheduler.summary_updated.connect(
+            lambda summary: print(f"已完成 {summary['done_jobs']}/{summary['jobs']} 个任务，"
+                                  f"{summary['files_per_second']} 文件/秒，{summary['mb_per_second']} MB/s",
+                                  file=sys.stderr, flush=True))
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: scheduler.stop())
+
+    summary = scheduler.run()
+    summary["results"] = [dict(result or {}, folder=job.folder, ok=result is not None)
+                          for job, result in zip(jobs, scheduler.results)]
+    summary["ok"] = summary["failed_jobs"] == 0
+    summary["status"] = (f"{summary['done_jobs']}/{summary['jobs']} 个任务完成，移动 {summary['moved']} 个文件，"
+                         f"{summary['files_per_second']} 文件/秒")
+    return summary
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.folder and not args.apply and not args.undo and not args.jobs:
+        parser.error("需要指定要整理的文件夹、--apply 计划文件、--undo 移动记录或 --jobs 批量任务")
+    output = run_jobs(args) if args.jobs else run(args)
+    if args.json:
+        print(json.dumps(output, ensure_ascii=False))
+    elif args.quiet:
+        print(output["status"])
+    # 监视模式只能通过停止结束，不算作失败
+    if not output["ok"] or output.get("errors") or (output.get("stopped") and not args.watch):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
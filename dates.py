@@ -0,0 +1,115 @@
+# dates.py
+# 按日期分桶时使用的日期来源：EXIF 拍摄时间(JPEG 及基于 TIFF 的 RAW 格式，只读取文件开头)
+# 和文件名中的日期(IMG_20230514_123456.jpg、2023-05-14.log 等)
+
+import re
+from datetime import datetime
+
+# 读取 EXIF 时最多读取的字节数，APP1 段通常位于文件开头 64KB 之内
+EXIF_READ_SIZE = 128 * 1024
+
+# 可能带有 EXIF 的拓展名，其他文件不读取
+EXIF_EXTS = frozenset(('.jpg', '.jpeg', '.tif', '.tiff', '.dng', '.nef', '.cr2', '.arw', '.orf', '.rw2'))
+
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME = 0x0132
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+
+# 年月日之间可以有 - _ . 分隔，日期后可以紧跟六位时间
+FILENAME_DATE = re.compile(r"(?<!\d)((?:19|20)\d\d)[-_.]?(0[1-9]|1[0-2])[-_.]?(0[1-9]|[12]\d|3[01])"
+                           r"(?=\D|$|\d{6}(?:\D|$))")
+
+
+def filename_timestamp(name):
+    # 文件名中的日期(当地时间零点)，没有时返回None
+    match = FILENAME_DATE.search(name)
+    if match is None:
+        return None
+    try:
+        return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3))).timestamp()
+    except (ValueError, OverflowError):
+        # 例如 2月30日
+        return None
+
+
+def exif_timestamp(path, ext):
+    # EXIF 中的拍摄时间，没有或无法解析时返回None
+    if ext.lower() not in EXIF_EXTS:
+        return None
+    try:
+        with open(path, "rb") as f:
+            head = f.read(EXIF_READ_SIZE)
+        if head.startswith(b"\xff\xd8"):
+            tiff = _jpeg_exif(head)
+        elif head.startswith((b"II*\x00", b"MM\x00*")):
+            tiff = head
+        else:
+            return None
+        if tiff is None:
+            return None
+        return _tiff_timestamp(tiff)
+    except (OSError, IndexError, ValueError, OverflowError):
+        return None
+
+
+def _jpeg_exif(data):
+    # 在 JPEG 的段中找到 APP1 Exif，返回其中的 TIFF 数据
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # 填充字节
+            position += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            position += 2
+            continue
+        if marker == 0xDA:
+            # 图像数据开始，之后不再有元数据段
+            return None
+        length = int.from_bytes(data[position + 2:position + 4], "big")
+        if marker == 0xE1 and data[position + 4:position + 10] == b"Exif\x00\x00":
+            return data[position + 10:position + 2 + length]
+        position += 2 + length
+    return None
+
+
+def _tiff_timestamp(data):
+    byteorder = "little" if data[:2] == b"II" else "big"
+
+    def number(offset, size):
+        if offset + size > len(data):
+            raise ValueError("EXIF 数据不完整")
+        return int.from_bytes(data[offset:offset + size], byteorder)
+
+    def read_ifd(offset):
+        # 标签 -> 值字段的偏移
+        entries = {}
+        for index in range(number(offset, 2)):
+            entry = offset + 2 + index * 12
+            entries[number(entry, 2)] = entry
+        return entries
+
+    def ascii_value(entry):
+        count = number(entry + 4, 4)
+        start = entry + 8 if count <= 4 else number(entry + 8, 4)
+        return data[start:start + count].rstrip(b"\x00 ").decode("ascii")
+
+    ifd0 = read_ifd(number(4, 4))
+    candidates = []
+    if TAG_EXIF_IFD in ifd0:
+        exif_ifd = read_ifd(number(ifd0[TAG_EXIF_IFD] + 8, 4))
+        candidates += [exif_ifd.get(TAG_DATETIME_ORIGINAL), exif_ifd.get(TAG_DATETIME_DIGITIZED)]
+    candidates.append(ifd0.get(TAG_DATETIME))
+    for entry in candidates:
+        if entry is None:
+            continue
+        try:
+            return datetime.strptime(ascii_value(entry)[:19], "%Y:%m:%d %H:%M:%S").timestamp()
+        except (ValueError, UnicodeDecodeError):
+            # 相机未设置时间时为 "0000:00:00 00:00:00"
+            continue
+    return None
@@ -0,0 +1,123 @@
+# duplicates.py
+# 重复文件检测：先按大小分组，大小相同的文件再比较首尾两块的部分哈希，仍然相同的才读取全部内容。
+# 全量哈希用 mmap 读取，多个线程并行计算(hashlib 计算时释放 GIL)。
+# 哈希按 (inode, 大小, 修改时间) 缓存在本地数据库中，文件不变时再次整理无需重新读取
+
+import hashlib
+import mmap
+import os
+import sqlite3
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+# 部分哈希读取的块大小，不超过两块的文件部分哈希已覆盖全部内容
+PARTIAL_BLOCK = 64 * 1024
+
+
+def _new_digest():
+    return hashlib.blake2b(digest_size=20)
+
+
+def partial_hash(path, size, block=PARTIAL_BLOCK):
+    digest = _new_digest()
+    with open(path, "rb") as f:
+        digest.update(f.read(block))
+        if size > block:
+            # 末尾一块，与开头一块不重叠
+            f.seek(max(size - block, block))
+            digest.update(f.read(block))
+    return digest.hexdigest()
+
+
+def full_hash(path, size):
+    digest = _new_digest()
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            digest.update(mapped)
+    return digest.hexdigest()
+
+
+class HashCache:
+    # 哈希缓存，inode 为 0 或未知(例如 Windows 上的扫描结果)的文件不缓存
+    def __init__(self, db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS hashes (ino INTEGER, size INTEGER, mtime REAL, "
+                        "partial TEXT, full TEXT, PRIMARY KEY (ino, size, mtime))")
+        self.db.commit()
+
+    def get(self, record, kind):
+        if not record.ino:
+            return None
+        row = self.db.execute(f"SELECT {kind} FROM hashes WHERE ino = ? AND size = ? AND mtime = ?",
+                              (record.ino, record.size, record.mtime)).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, record, kind, value):
+        if not record.ino:
+            return
+        self.db.execute(f"INSERT INTO hashes (ino, size, mtime, {kind}) VALUES (?, ?, ?, ?) "
+                        f"ON CONFLICT (ino, size, mtime) DO UPDATE SET {kind} = excluded.{kind}",
+                        (record.ino, record.size, record.mtime, value))
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+
+def _hash_or_none(function, record):
+    try:
+        return function(record.path, record.size)
+    except (OSError, ValueError):
+        # 文件在检测过程中被删除或无法读取，不参与比较
+        return None
+
+
+def _split_groups(groups, function, kind, pool, cache):
+    # 按哈希把每组继续细分，只保留仍有多个文件的组
+    hashes = {}
+    todo = []
+    for group in groups:
+        for record in group:
+            cached = cache.get(record, kind) if cache is not None else None
+            if cached is not None:
+                hashes[record.path] = cached
+            else:
+                todo.append(record)
+    for record, value in zip(todo, pool.map(lambda record: _hash_or_none(function, record), todo)):
+        if value is not None:
+            hashes[record.path] = value
+            if cache is not None:
+                cache.put(record, kind, value)
+
+    result = []
+    for group in groups:
+        subgroups = defaultdict(list)
+        for record in group:
+            value = hashes.get(record.path)
+            if value is not None:
+                subgroups[value].append(record)
+        result.extend(subgroup for subgroup in subgroups.values() if len(subgroup) > 1)
+    return result
+
+
+def find_duplicates(records, cache=None, workers=4):
+    """
+    返回内容相同的文件组，每组按 (修改时间, 路径) 排序，第一个视为原件
+        records: FileRecord 序列，需要记录 path；空文件不参与比较
+        cache: HashCache，为None时不缓存
+    """
+    by_size = defaultdict(list)
+    for record in records:
+        if record.size > 0:
+            by_size[record.size].append(record)
+    groups = [group for group in by_size.values() if len(group) > 1]
+    if not groups:
+        return []
+
+    with ThreadPoolExecutor(max(1, workers)) as pool:
+        groups = _split_groups(groups, partial_hash, "partial", pool, cache)
+        small = [group for group in groups if group[0].size <= 2 * PARTIAL_BLOCK]
+        large = [group for group in groups if group[0].size > 2 * PARTIAL_BLOCK]
+        groups = small + _split_groups(large, full_hash, "full", pool, cache)
+    return [sorted(group, key=lambda record: (record.mtime, record.path)) for group in groups]
@@ -0,0 +1,96 @@
+# executor.py
+# 并发执行移动操作：网络文件系统上每次 rename 都是一次往返，串行执行时整体受延迟限制。
+# 每个工作线程拥有一个有界队列，目标文件夹按哈希固定分配到同一个线程，
+# 因此同一目标文件夹内的移动顺序与提交顺序一致
+
+import queue
+import threading
+
+# 取消时放入队列的结束标记
+_STOP = object()
+
+
+class MoveExecutor:
+    def __init__(self, move, workers, queue_size=256):
+        # move(*args) 在工作线程中调用，由它自己处理和报告错误
+        self.move = move
+        self.cancelled = False
+        # 已提交但尚未完成的任务数
+        self.pending = 0
+        self.idle = threading.Condition()
+        self.lanes = [queue.Queue(maxsize=queue_size) for _ in range(max(1, workers))]
+        self.threads = []
+        for index, lane in enumerate(self.lanes):
+            thread = threading.Thread(target=self._work, args=(lane,), name=f"move-worker-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, key, *args):
+        # key 一般为目标文件夹，相同 key 的任务由同一个线程按顺序执行；队列满时阻塞
+        if self.cancelled:
+            return False
+        lane = self.lanes[hash(key) % len(self.lanes)]
+        with self.idle:
+            self.pending += 1
+        while not self.cancelled:
+            try:
+                lane.put(args, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        self._task_done()
+        return False
+
+    def wait_idle(self):
+        # 等待已提交的任务全部完成，工作线程继续运行
+        with self.idle:
+            while self.pending and not self.cancelled:
+                self.idle.wait(0.1)
+
+    def _task_done(self):
+        with self.idle:
+            self.pending -= 1
+            if not self.pending:
+                self.idle.notify_all()
+
+    def cancel(self):
+        # 丢弃尚未执行的任务，正在执行的移动会完成
+        self.cancelled = True
+        for lane in self.lanes:
+            self._drain(lane)
+
+    def join(self):
+        # 等待已提交的任务全部完成并结束工作线程
+        for lane in self.lanes:
+            while True:
+                try:
+                    lane.put(_STOP, timeout=0.1)
+                    break
+                except queue.Full:
+                    if self.cancelled:
+                        self._drain(lane)
+        for thread in self.threads:
+            thread.join()
+
+    @staticmethod
+    def _drain(lane):
+        try:
+            while True:
+                lane.get_nowait()
+        except queue.Empty:
+            pass
+
+    def _work(self, lane):
+        while True:
+            args = lane.get()
+            if args is _STOP:
+                return
+            if self.cancelled:
+                self._task_done()
+                continue
+            try:
+                self.move(*args)
+            except Exception:
+                # 意外的异常不能结束工作线程，否则该线程队列中的任务永远不会完成
+                pass
+            self._task_done()
@@ -0,0 +1,245 @@
+# fileops.py
+# 跨设备移动：os.rename 在目标位于其他挂载点时会失败(EXDEV)，此时在内核中复制数据
+# (copy_file_range / sendfile，不经过用户态缓冲区)，先写入临时文件，再改名为目标文件，最后删除源文件。
+# 不覆盖的改名：目标已存在时原子地失败(renameat2 RENAME_NOREPLACE，或 link + unlink)，不需要先检查再改名
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import shutil
+import threading
+import time
+
+# 单次内核复制的最大字节数
+COPY_CHUNK = 64 * 1024 * 1024
+# 所有内核复制方式都不可用时使用的缓冲区大小
+BUFFER_SIZE = 1024 * 1024
+
+
+def _copy_with_copy_file_range(fd_in, fd_out, size):
+    copied = 0
+    while copied < size:
+        count = os.copy_file_range(fd_in, fd_out, min(COPY_CHUNK, size - copied))
+        if count == 0:
+            break
+        copied += count
+    return copied
+
+
+def _copy_with_sendfile(fd_in, fd_out, size):
+    copied = 0
+    while copied < size:
+        count = os.sendfile(fd_out, fd_in, copied, min(COPY_CHUNK, size - copied))
+        if count == 0:
+            break
+        copied += count
+    # sendfile 指定偏移量时不会移动源文件的读取位置
+    os.lseek(fd_in, copied, os.SEEK_SET)
+    return copied
+
+
+def _copy_with_buffer(fd_in, fd_out, size):
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    copied = 0
+    while True:
+        count = _read_into(fd_in, buffer)
+        if count == 0:
+            break
+        written = 0
+        while written < count:
+            written += os.write(fd_out, view[written:count])
+        copied += count
+    return copied
+
+
+def _read_into(fd, buffer):
+    if hasattr(os, "readv"):
+        return os.readv(fd, [buffer])
+    data = os.read(fd, len(buffer))
+    buffer[:len(data)] = data
+    return len(data)
+
+
+def _kernel_copies():
+    if hasattr(os, "copy_file_range"):
+        yield _copy_with_copy_file_range
+    if hasattr(os, "sendfile"):
+        yield _copy_with_sendfile
+
+
+def copy_fd(fd_in, fd_out, size):
+    # 依次尝试 copy_file_range、sendfile，都不支持时退回到普通读写，返回复制的字节数
+    for copy in _kernel_copies():
+        try:
+            copied = copy(fd_in, fd_out, size)
+        except OSError:
+            # 内核或文件系统不支持，从头改用下一种方式
+            os.lseek(fd_in, 0, os.SEEK_SET)
+            os.lseek(fd_out, 0, os.SEEK_SET)
+            os.ftruncate(fd_out, 0)
+            continue
+        # 复制过程中文件变大时，剩余部分用普通读写补齐
+        return copied + _copy_with_buffer(fd_in, fd_out, size)
+    return _copy_with_buffer(fd_in, fd_out, size)
+
+
+AT_FDCWD = -100
+RENAME_NOREPLACE = 1
+
+
+def _load_renameat2():
+    # glibc 2.28 之后提供 renameat2；其他系统返回None
+    if os.name == "nt":
+        return None
+    try:
+        function = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True).renameat2
+    except (OSError, AttributeError, TypeError):
+        return None
+    function.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_int, ctypes.c_char_p, ctypes.c_uint]
+    return function
+
+
+_renameat2 = _load_renameat2()
+
+
+def rename_noreplace(src, dst):
+    # 改名，目标已存在时抛出 FileExistsError，不会覆盖
+    if _renameat2 is not None:
+        if _renameat2(AT_FDCWD, os.fsencode(src), AT_FDCWD, os.fsencode(dst), RENAME_NOREPLACE) == 0:
+            return
+        error = ctypes.get_errno()
+        # 文件系统或内核不支持该标志时改用 link
+        if error not in (errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP):
+            raise OSError(error, os.strerror(error), src, None, dst)
+    if os.name == "nt":
+        # Windows 上 os.rename 本身不会覆盖已存在的文件
+        os.rename(src, dst)
+        return
+    try:
+        os.link(src, dst, follow_symlinks=False)
+    except FileExistsError:
+        raise
+    except (OSError, NotImplementedError) as e:
+        if isinstance(e, OSError) and e.errno == errno.EXDEV:
+            raise
+        # 不支持硬链接的文件系统(FAT、部分网络共享)，只能先检查再改名
+        if os.path.lexists(dst):
+            raise FileExistsError(errno.EEXIST, os.strerror(errno.EEXIST), dst)
+        os.rename(src, dst)
+        return
+    os.unlink(src)
+
+
+def move_across_devices(src, dst, replace=True):
+    # 跨设备移动文件，返回复制的字节数。失败时删除临时文件，源文件保持不变；
+    # replace 为 False 时目标已存在则抛出 FileExistsError
+    dest_dir, dest_name = os.path.split(dst)
+    tmp_path = os.path.join(dest_dir, f".{dest_name}.{os.getpid()}.tmp")
+    flags = getattr(os, "O_BINARY", 0)
+    fd_in = os.open(src, os.O_RDONLY | flags)
+    try:
+        stat = os.fstat(fd_in)
+        fd_out = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | flags, stat.st_mode & 0o777)
+        try:
+            copied = copy_fd(fd_in, fd_out, stat.st_size)
+            os.fsync(fd_out)
+        finally:
+            os.close(fd_out)
+    except BaseException:
+        os.close(fd_in)
+        _remove_quietly(tmp_path)
+        raise
+    os.close(fd_in)
+
+    try:
+        # 保留修改时间等属性，按时间分类的规则依赖 mtime
+        shutil.copystat(src, tmp_path)
+        if replace:
+            os.replace(tmp_path, dst)
+        else:
+            rename_noreplace(tmp_path, dst)
+    except BaseException:
+        _remove_quietly(tmp_path)
+        raise
+    os.unlink(src)
+    return copied
+
+
+def _remove_quietly(path):
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def fsync_dir(path):
+    # 把文件夹中的目录项(新建、改名、删除)写入磁盘；Windows 上无法打开文件夹，直接跳过
+    try:
+        fd = os.open(path, os.O_RDONLY | getattr(os, "O_DIRECTORY", 0))
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+# 持久化模式：fast 不 fsync；batched 每 batch_size 次移动或 interval 秒 fsync 一次涉及的文件夹；strict 每次移动都 fsync
+DURABILITY_MODES = ("fast", "batched", "strict")
+
+
+class DirectorySync:
+    def __init__(self, mode="fast", batch_size=256, interval=0.2):
+        if mode not in DURABILITY_MODES:
+            raise ValueError(f"未知的持久化模式: {mode}")
+        self.mode = mode
+        self.batch_size = batch_size
+        self.interval = interval
+        self.lock = threading.Lock()
+        # 等待 fsync 的文件夹和移动次数
+        self.dirty = set()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def touch(self, *folders):
+        # 记录目录项发生变化的文件夹
+        if self.mode == "fast":
+            return
+        if self.mode == "strict":
+            for folder in set(folders):
+                fsync_dir(folder)
+            return
+        with self.lock:
+            self.dirty.update(folders)
+            self.pending += 1
+            if self.pending < self.batch_size and time.monotonic() - self.last_flush < self.interval:
+                return
+            folders = self._take()
+        for folder in folders:
+            fsync_dir(folder)
+
+    def flush(self):
+        with self.lock:
+            folders = self._take()
+        for folder in folders:
+            fsync_dir(folder)
+
+    def flush_due(self):
+        # 没有新的移动时由调用方定期调用，保证 interval 秒内写入磁盘
+        with self.lock:
+            if not self.dirty or time.monotonic() - self.last_flush < self.interval:
+                return
+            folders = self._take()
+        for folder in folders:
+            fsync_dir(folder)
+
+    def _take(self):
+        folders = self.dirty
+        self.dirty = set()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        return folders
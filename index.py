@@ -0,0 +1,92 @@
+# index.py
+# 增量整理用的本地索引(SQLite)：记录每个文件夹上次整理结束时的修改时间和子文件夹，
+# 以及留在原处(未被移动)的文件的 (inode, 大小, 修改时间)。
+# 再次整理时，修改时间未变的文件夹不再列出内容，只进入记录的子文件夹；
+# 发生变化的文件夹中，只有新增或改变过的文件才会重新判断，整理耗时与变化量成正比。
+# 注意：只修改文件内容不会改变文件夹的修改时间，这类变化要等文件夹本身变化后才会被发现
+
+import json
+import os
+import sqlite3
+import threading
+
+
+class DirectoryIndex:
+    def __init__(self, db_path, rules_digest):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS dirs (path TEXT PRIMARY KEY, mtime_ns INTEGER, subdirs TEXT)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS files (dir TEXT, name TEXT, ino INTEGER, size INTEGER, "
+                        "mtime REAL, PRIMARY KEY (dir, name))")
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'rules_hash'").fetchone()
+        if row is None or row[0] != rules_digest:
+            # 规则改变后，之前的判断结果全部失效
+            self.db.execute("DELETE FROM dirs")
+            self.db.execute("DELETE FROM files")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('rules_hash', ?)", (rules_digest,))
+        self.db.commit()
+
+        # 本次整理中重新列出内容的文件夹：路径 -> [列出时的修改时间, 子文件夹名, 留在原处的文件]
+        self.scanned = {}
+        # 有文件移出的文件夹；有文件移动失败的文件夹，下次必须重新列出
+        self.moved_from = set()
+        self.dirty = set()
+        self.lock = threading.Lock()
+
+    def unchanged_subdirs(self, path, mtime_ns):
+        # 文件夹未变化时返回记录的子文件夹名，否则返回None
+        row = self.db.execute("SELECT mtime_ns, subdirs FROM dirs WHERE path = ?", (path,)).fetchone()
+        if row is None or row[0] != mtime_ns:
+            return None
+        return json.loads(row[1])
+
+    def begin_dir(self, path, mtime_ns):
+        # 开始列出一个变化过的文件夹，返回其中已知文件 名称 -> (inode, 大小, 修改时间)
+        self.scanned[path] = [mtime_ns, [], []]
+        return {name: (ino, size, mtime) for name, ino, size, mtime in
+                self.db.execute("SELECT name, ino, size, mtime FROM files WHERE dir = ?", (path,))}
+
+    def end_dir(self, path, subdirs):
+        self.scanned[path][1] = subdirs
+
+    def keep(self, directory, name, ino, size, mtime):
+        # 文件留在原处(未变化或不需要移动)，下次整理时跳过
+        entry = self.scanned.get(directory)
+        if entry is not None:
+            entry[2].append((directory, name, ino, size, mtime))
+
+    def remember(self, record):
+        self.keep(os.path.dirname(record.path), record.name, record.ino, record.size, record.mtime)
+
+    def mark_moved(self, directory):
+        with self.lock:
+            self.moved_from.add(directory)
+
+    def mark_dirty(self, directory):
+        with self.lock:
+            self.dirty.add(directory)
+
+    def finish(self):
+        # 整理完成后写入索引。没有文件移出的文件夹记录列出时的修改时间，整理期间新增的文件下次能被发现；
+        # 有文件移出的文件夹在移动结束后重新读取修改时间，本次移出引起的变化不会导致下次重新列出
+        with self.db:
+            for path, (scan_mtime, subdirs, files) in self.scanned.items():
+                self.db.execute("DELETE FROM files WHERE dir = ?", (path,))
+                self.db.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", files)
+                mtime_ns = scan_mtime
+                if path in self.dirty:
+                    mtime_ns = -1
+                elif path in self.moved_from:
+                    try:
+                        mtime_ns = os.stat(path).st_mtime_ns
+                    except OSError:
+                        mtime_ns = -1
+                self.db.execute("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?)",
+                                (path, mtime_ns, json.dumps(subdirs, ensure_ascii=False)))
+        self.scanned = {}
+        self.moved_from = set()
+        self.dirty = set()
+
+    def close(self):
+        self.db.close()
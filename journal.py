@@ -0,0 +1,139 @@
+# journal.py
+# 移动记录：每次成功的移动都追加一行 (源路径, 目标路径)，写入时按批合并后再 fsync，
+# 不会明显拖慢整理过程。撤销时倒序读取记录，把文件移回原处
+
+import json
+import os
+import threading
+import time
+
+from checkpoint import source_digest
+
+# 整理程序自己的文件(记录、索引等)存放在目标文件夹下的该隐藏文件夹中，扫描时会跳过
+STATE_DIR = ".fileorganizer"
+
+
+def state_dir(target_dir):
+    return os.path.join(target_dir, STATE_DIR)
+
+
+def new_journal_path(target_dir, source=None):
+    """
+    新建一个空的记录文件并返回路径
+        多个源文件夹可能整理到同一目标文件夹，同一进程中也可能同时运行多个整理(批量任务)，
+        文件名中带上源文件夹的哈希和纳秒时间，并以 O_EXCL 创建，两次整理不会共用同一个记录文件
+    """
+    folder = state_dir(target_dir)
+    os.makedirs(folder, exist_ok=True)
+    digest = source_digest(source) if source else "0" * 12
+    while True:
+        now = time.time_ns()
+        name = (time.strftime("journal-%Y%m%d-%H%M%S", time.localtime(now // 1_000_000_000))
+                + f"-{now % 1_000_000_000:09d}-{digest}-{os.getpid()}.jsonl")
+        path = os.path.join(folder, name)
+        try:
+            os.close(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+            return path
+        except FileExistsError:
+            continue
+
+
+def latest_journal(target_dir):
+    # 返回最近一次整理的记录文件，没有时返回None
+    folder = state_dir(target_dir)
+    # 没有移动任何文件的整理不留下记录，空文件(例如中断的整理)也跳过
+    candidates = []
+    try:
+        for entry in os.scandir(folder):
+            if entry.name.startswith("journal-") and entry.name.endswith(".jsonl"):
+                stat = entry.stat()
+                if stat.st_size > 0:
+                    candidates.append((stat.st_mtime, entry.path))
+    except OSError:
+        return None
+    if not candidates:
+        return None
+    return max(candidates)[1]
+
+
+class BatchedLog:
+    # 只追加的日志文件，攒够 batch_size 行或超过 flush_interval 秒才写入并 fsync 一次；
+    # before_flush 在每次写入新的行之前调用
+    def __init__(self, path, batch_size=512, flush_interval=1.0, before_flush=None):
+        self.path = path
+        self.before_flush = before_flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lock = threading.Lock()
+        self.pending = []
+        self.last_flush = time.monotonic()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+
+    def append(self, line):
+        with self.lock:
+            self.pending.append(line)
+            if len(self.pending) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def flush_due(self):
+        # 没有新的记录时由调用方定期调用，保证 flush_interval 秒内写入磁盘
+        with self.lock:
+            if self.pending and time.monotonic() - self.last_flush >= self.flush_interval:
+                self._flush()
+
+    def _flush(self):
+        if self.pending:
+            if self.before_flush is not None:
+                self.before_flush()
+            self.file.write("\n".join(self.pending))
+            self.file.write("\n")
+            self.pending = []
+            self.file.flush()
+            os.fsync(self.file.fileno())
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        with self.lock:
+            self._flush()
+            self.file.close()
+
+
+class Journal(BatchedLog):
+    def close(self):
+        # 没有记录任何移动时删除空文件，否则它会成为最新的记录，撤销时什么也不做
+        super().close()
+        try:
+            if os.path.getsize(self.path) == 0:
+                os.unlink(self.path)
+        except OSError:
+            pass
+
+    def record(self, source, destination, size, dedupe=False):
+        # dedupe 为 True 表示源文件与目标文件内容相同，源文件已被删除
+        data = {"src": source, "dst": destination, "size": size}
+        if dedupe:
+            data["dedupe"] = True
+        self.append(json.dumps(data, ensure_ascii=False))
+
+
+def read_lines_reversed(path, block_size=64 * 1024):
+    # 从文件末尾按块倒序读取非空行，不需要把整个文件载入内存
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END)
+        remainder = b""
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            lines = (f.read(read_size) + remainder).split(b"\n")
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line.decode("utf-8")
+        if remainder.strip():
+            yield remainder.decode("utf-8")
@@ -0,0 +1,106 @@
+# matcher.py
+# 自定义关键词索引：拓展名关键词用哈希表，文件名关键词用 Aho-Corasick 自动机，
+# 对文件名只扫描一遍，返回按关键词顺序(优先级)最靠前的匹配项
+
+from collections import deque
+
+# 文件名关键词少于该数量时，直接用 str 的 in 逐个查找比纯 Python 自动机更快
+LINEAR_SCAN_LIMIT = 16
+
+_NO_MATCH = float("inf")
+
+
+class KeywordMatcher:
+    __slots__ = ("keywords", "ext_index", "patterns", "goto", "fail", "output", "first_pattern")
+
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        # 拓展名 -> 在关键词列表中的位置，重复的关键词保留第一次出现的位置
+        self.ext_index = {}
+        # (位置, 关键词)，只包含文件名关键词
+        self.patterns = []
+        for index, keyword in enumerate(self.keywords):
+            if keyword.startswith('.'):
+                self.ext_index.setdefault(keyword, index)
+            else:
+                self.patterns.append((index, keyword))
+        self.first_pattern = self.patterns[0][0] if self.patterns else _NO_MATCH
+
+        self.goto = None
+        self.fail = None
+        self.output = None
+        if len(self.patterns) >= LINEAR_SCAN_LIMIT:
+            self._build_automaton()
+
+    def _build_automaton(self):
+        # goto[state]: 字符 -> 下一个状态；output[state]: 以该状态结尾的关键词的最小位置
+        goto = [{}]
+        output = [_NO_MATCH]
+        for index, keyword in self.patterns:
+            state = 0
+            for char in keyword:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    output.append(_NO_MATCH)
+                state = next_state
+            if index < output[state]:
+                output[state] = index
+
+        # 广度优先计算失败指针，并把失败链上的输出合并到当前状态
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[next_state] = target if target != next_state else 0
+                if output[fail[next_state]] < output[next_state]:
+                    output[next_state] = output[fail[next_state]]
+
+        self.goto = goto
+        self.fail = fail
+        self.output = output
+
+    def match(self, name, ext):
+        # name 为不含拓展名的文件名，返回匹配的关键词，没有匹配时返回None
+        best = self.ext_index.get(ext, _NO_MATCH) if self.ext_index else _NO_MATCH
+        if best > self.first_pattern:
+            if self.goto is None:
+                for index, keyword in self.patterns:
+                    if index >= best:
+                        break
+                    if keyword in name:
+                        best = index
+                        break
+            else:
+                best = self._scan(name, best)
+        if best == _NO_MATCH:
+            return None
+        return self.keywords[best]
+
+    def _scan(self, name, best):
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        first_pattern = self.first_pattern
+        # 空关键词在根状态就匹配
+        if output[0] < best:
+            best = output[0]
+        state = 0
+        for char in name:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state] < best:
+                best = output[state]
+                # 已经是优先级最高的文件名关键词，不可能再更靠前
+                if best == first_pattern:
+                    break
+        return best
@@ -0,0 +1,176 @@
+# metrics.py
+# 可选的分阶段计时：记录整理各阶段(列出文件夹、stat、筛选、分类、mkdir、改名等)的调用次数、累计耗时
+# 和耗时分布，整理结束时生成报告，也可以写成 Prometheus 文本格式，供 node_exporter 的 textfile 收集器读取。
+# 未开启时整理过程中不调用任何计时代码
+
+import math
+import os
+import threading
+import time
+
+# 直方图的上界(秒)：1 微秒起每档翻倍，最后一档约 16.8 秒，之外的计入 +Inf
+BUCKET_BASE = 1e-6
+BUCKET_COUNT = 25
+BUCKETS = tuple(BUCKET_BASE * 2 ** index for index in range(BUCKET_COUNT))
+
+
+def bucket_index(seconds):
+    # 第一个上界不小于 seconds 的档位，超过最后一档时为 BUCKET_COUNT
+    if seconds <= BUCKET_BASE:
+        return 0
+    mantissa, exponent = math.frexp(seconds / BUCKET_BASE)
+    # seconds / BUCKET_BASE 恰好为 2 的幂时 mantissa 为 0.5
+    index = exponent - 1 if mantissa == 0.5 else exponent
+    return min(index, BUCKET_COUNT)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self):
+        self.counts = [0] * (BUCKET_COUNT + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bucket_index(seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def quantile(self, q):
+        # 与 Prometheus 的 histogram_quantile 相同，在所在档位内线性插值；不超过实际的最大值
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            if count and cumulative + count >= rank:
+                if index == BUCKET_COUNT:
+                    return self.max
+                lower = BUCKETS[index - 1] if index else 0.0
+                value = lower + (BUCKETS[index] - lower) * (rank - cumulative) / count
+                return min(value, self.max)
+            cumulative += count
+        return self.max
+
+
+class _Timer:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+
+class StageMetrics:
+    # 各阶段的直方图，移动线程并发记录
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stages = {}
+        self.start_time = time.time()
+        self.start = time.perf_counter()
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def time(self, stage):
+        # with metrics.time("mkdir"): ...
+        return _Timer(self, stage)
+
+    def timed_iter(self, stage, iterable):
+        # 逐个产出 iterable 的元素，每次取下一个元素的耗时计入 stage
+        iterator = iter(iterable)
+        clock = time.perf_counter
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.observe(stage, clock() - start)
+                return
+            self.observe(stage, clock() - start)
+            yield item
+
+    def report(self):
+        # {阶段: {calls, total_s, mean_us, p50_us, p99_us, max_us}}，按累计耗时从大到小排列
+        with self.lock:
+            stages = sorted(self.stages.items(), key=lambda item: item[1].sum, reverse=True)
+            return {
+                "elapsed_s": round(time.perf_counter() - self.start, 6),
+                "stages": {stage: {
+                    "calls": histogram.count,
+                    "total_s": round(histogram.sum, 6),
+                    "mean_us": round(histogram.sum / histogram.count * 1e6, 2) if histogram.count else 0.0,
+                    "p50_us": round(histogram.quantile(0.5) * 1e6, 2),
+                    "p99_us": round(histogram.quantile(0.99) * 1e6, 2),
+                    "max_us": round(histogram.max * 1e6, 2),
+                } for stage, histogram in stages},
+            }
+
+    def format_report(self):
+        # 文本表格，每个阶段一行
+        report = self.report()
+        # 中文字符占两列，表头按显示宽度对齐
+        lines = [f"{'阶段':<18}{'次数':>8}{'累计(s)':>10}{'平均(us)':>10}{'p50(us)':>12}{'p99(us)':>12}{'最大(us)':>10}"]
+        for stage, item in report["stages"].items():
+            lines.append(f"{stage:<20}{item['calls']:>10}{item['total_s']:>12.4f}{item['mean_us']:>12.1f}"
+                         f"{item['p50_us']:>12.1f}{item['p99_us']:>12.1f}{item['max_us']:>12.1f}")
+        lines.append(f"总耗时 {report['elapsed_s']:.3f} s")
+        return "\n".join(lines)
+
+    def write_prometheus(self, path, labels=None, counters=None):
+        """
+        写成 Prometheus 文本格式，先写入临时文件再替换，node_exporter 不会读到写了一半的文件
+            labels: 附加到每个指标上的标签，例如 {"folder": "/data/upload"}
+            counters: 整理结果的计数(processed、moved 等)，导出为 fileorganizer_files 等指标
+        """
+        base_labels = "".join(f'{key}="{_escape(value)}",' for key, value in (labels or {}).items())
+        lines = ["# HELP fileorganizer_stage_seconds Time spent in each organize stage.",
+                 "# TYPE fileorganizer_stage_seconds histogram"]
+        with self.lock:
+            for stage, histogram in self.stages.items():
+                stage_labels = f'{base_labels}stage="{_escape(stage)}"'
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'fileorganizer_stage_seconds_bucket{{{stage_labels},le="{bound:g}"}} {cumulative}')
+                lines.append(f'fileorganizer_stage_seconds_bucket{{{stage_labels},le="+Inf"}} {histogram.count}')
+                lines.append(f"fileorganizer_stage_seconds_sum{{{stage_labels}}} {histogram.sum:.9f}")
+                lines.append(f"fileorganizer_stage_seconds_count{{{stage_labels}}} {histogram.count}")
+        plain_labels = "{" + base_labels.rstrip(",") + "}" if base_labels else ""
+        lines += ["# HELP fileorganizer_run_duration_seconds Wall time of the last organize run.",
+                  "# TYPE fileorganizer_run_duration_seconds gauge",
+                  f"fileorganizer_run_duration_seconds{plain_labels} {time.perf_counter() - self.start:.6f}",
+                  "# HELP fileorganizer_last_run_timestamp_seconds Start time of the last organize run.",
+                  "# TYPE fileorganizer_last_run_timestamp_seconds gauge",
+                  f"fileorganizer_last_run_timestamp_seconds{plain_labels} {self.start_time:.3f}"]
+        if counters:
+            lines += ["# HELP fileorganizer_files Files by outcome in the last organize run.",
+                      "# TYPE fileorganizer_files gauge"]
+            for outcome in ("processed", "moved", "skipped", "errors"):
+                lines.append(f'fileorganizer_files{{{base_labels}outcome="{outcome}"}} {counters.get(outcome, 0)}')
+            lines += ["# HELP fileorganizer_moved_bytes Bytes moved in the last organize run.",
+                      "# TYPE fileorganizer_moved_bytes gauge",
+                      f"fileorganizer_moved_bytes{plain_labels} {counters.get('bytes', 0)}"]
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, path)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
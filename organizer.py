@@ -1,25 +1,124 @@
 # organizer.py
 
 import os
+import errno
+import filecmp
 import json
+import shutil
+import threading
+import time
+from contextlib import nullcontext
 
-from PySide6.QtCore import QObject, Signal
+from duplicates import HashCache, find_duplicates
+from categories import OTHERS_FOLDER, CategoryRegistry
+from checkpoint import Checkpoint, file_position, rules_hash, source_digest
+from executor import MoveExecutor
+from fileops import DURABILITY_MODES, DirectorySync, move_across_devices, rename_noreplace
+from index import DirectoryIndex
+from journal import Journal, BatchedLog, new_journal_path, read_lines_reversed, state_dir
+from metrics import StageMetrics
+from parallel import default_processes, iter_plan_parallel
+from plan import PlanEntry, PlanWriter, UndoEntry, read_plan
+from reporter import DEFAULT_INTERVAL, ProgressReporter
+from rules import compile_rules, custom_folder_name, time_folder
+from walker import compile_globs, dir_key, walk_files
+from watcher import RESCAN, SettleQueue, make_watcher
 
 
-class FileOrganizer(QObject):
-    # 状态更新信号
-    status_updated = Signal(str)
-    # 进度信号
-    progress_updated = Signal(int)
-    # 结束信号
-    finished = Signal()
+class Callback:
+    # 与 Qt 信号相同的 connect/emit 用法，但不依赖 Qt，命令行下无需导入 PySide6
+    def __init__(self):
+        self.handlers = []
+
+    def connect(self, handler):
+        self.handlers.append(handler)
+
+    def disconnect(self, handler):
+        self.handlers.remove(handler)
+
+    def emit(self, *args):
+        for handler in self.handlers:
+            handler(*args)
+
+
+# 目标文件夹中已有同名文件时的处理方式
+COLLISION_POLICIES = ("skip", "overwrite", "rename", "keep_newer", "dedupe")
+# 重复文件默认移入的文件夹
+DUPLICATES_FOLDER = "重复文件"
+# 保存断点的间隔(秒)
+CHECKPOINT_INTERVAL = 5.0
+# 监视模式下等待事件的最长时间(秒)，决定停止监视的响应速度
+WATCH_POLL_TIMEOUT = 0.2
+
+
+class FileOrganizer:
+    def __init__(self, filepath, rules_json_filepath, workers=None, target_root=None, dry_run=False,
+                 plan_path=None, checkpoint=None, incremental=None, durability=None, processes=None,
+                 metrics=None, metrics_path=None):
+        # 状态更新回调
+        self.status_updated = Callback()
+        # 进度回调
+        self.progress_updated = Callback()
+        # 结束回调
+        self.finished = Callback()
 
-    def __init__(self, filepath, rules_json_filepath):
-        super().__init__()
         self.filepath = filepath
         self.rules_json_filepath = rules_json_filepath
+        # 并发移动的线程数，None 时使用规则文件中 execution.workers 的值，默认串行
+        self.workers = workers
+        # 分类文件夹所在的根目录，可以位于其他磁盘；None 时使用规则文件中的 target_root，默认为整理的文件夹本身
+        self.target_root = target_root
+        self.target_dir = filepath
+        # 只规划不移动
+        self.dry_run = dry_run
+        # 导出移动计划的文件(.jsonl 或 .csv)，None 时不导出
+        self.plan_path = plan_path
         self.rules = {}
+        # loadRules 编译得到的判定流水线和预设分类表
+        self.compiled_rules = None
+        self.categories = None
         self.isRunning = True
+        # 整理过程中的计数器，按 report_interval 秒的间隔合并发送进度和状态
+        self.reporter = None
+        self.report_interval = DEFAULT_INTERVAL
+        # 整理完成后的计数结果，整理未完成时为None
+        self.result = None
+        # 本次整理的移动记录；每次移动成功后调用的回调
+        self.journal = None
+        self.journal_path = None
+        self.on_moved = None
+        # 是否定期保存断点，None 时使用规则文件中 execution.checkpoint 的值
+        self.checkpoint_option = checkpoint
+        self.checkpoint = None
+        self.checkpoint_interval = CHECKPOINT_INTERVAL
+        self.last_checkpoint = 0.0
+        # 从断点继续时恢复的计数
+        self.resume_counters = None
+        # 是否增量整理，None 时使用规则文件中 scan.incremental 的值
+        self.incremental = incremental
+        self.index = None
+        # 重复文件 路径 -> 原件路径
+        self.duplicate_of = {}
+        # 最近一个已规划的文件，断点保存到该文件为止
+        self.last_record = None
+        self.executor = None
+        # 本次整理中已确认存在的目标文件夹
+        self.created_dirs = set()
+        # 规划文件的进程数，None 时使用规则文件中 execution.processes 的值，默认在当前进程中规划
+        self.processes = processes
+        # 移动结果的持久化模式，None 时使用规则文件中 execution.durability 的值
+        self.durability = durability
+        self.syncer = None
+        # 目标文件夹 -> 已有文件名，处理重名时使用；(文件夹, 文件名) -> 下一个可用的编号
+        self.dest_names = {}
+        self.dest_names_lock = threading.Lock()
+        self.next_suffix = {}
+        self.collision_policy = None
+        # 是否记录分阶段耗时，None 时使用规则文件中 metrics.enabled 的值；
+        # metrics_path 为写出 Prometheus 文本格式的文件，None 时使用 metrics.prometheus
+        self.metrics_option = metrics
+        self.metrics_path = metrics_path
+        self.metrics = None
 
     def stop(self):
         self.isRunning = False
@@ -30,12 +129,42 @@ class FileOrganizer(QObject):
                 "priority": ["custom", "size", "time", "default"],
                 "custom": {"enabled": True, "keyword": [xx,yy]}
                 "size": {"enabled": True, "model": "大于", "value1" : 100, "value2" : 200},
-                "time": {"enabled": True, "start_time": 1000000， "end_time": 2000000}, 
+                "time": {"enabled": True, "start_time": 1000000， "end_time": 2000000,
+                         "bucket": "%Y/%m", "date_source": ["exif", "filename", "mtime"], "folder": "照片"},
+                    (bucket 可选，按日期格式把文件分到 folder 下的日期文件夹中，此时时间范围可以省略；
+                     date_source 为日期来源，按顺序取第一个可用的，默认为 mtime)
                 "default": {"enabled": True,
-                    "images": True, "videos": True, "documents": True, "others": True
+                    "images": True, "videos": True, "documents": True, "others": True,
+                    "audio": True, "archives": True, "code": True, "raw": True, "cad": True,  (可选，见 categories.py)
+                    "sniff": False  (可选，拓展名无法识别的文件按文件头判断类型)
                 }}
             },
-            "filter_rule": {同上}
+            "filter_rule": {同上},
+            "categories": {"ebooks": {"folder": "电子书", "exts": [".epub", ".mobi"]}}
+                (可选，新增分类或为已有分类追加拓展名，新增的分类默认启用)
+            "execution": {"workers": 8, "journal": True, "checkpoint": False,
+                          "durability": "batched", "sync_batch": 256, "sync_interval_ms": 200, "collision": "rename",
+                          "processes": 4}
+                (可选，workers 为并发移动的线程数，默认为1即串行；journal 为是否记录移动操作以便撤销，默认记录；
+                 checkpoint 为是否定期保存断点，中断后再次整理时从断点继续，默认不保存；
+                 durability 为移动结果写入磁盘的方式：fast 不等待(默认)，batched 每 sync_batch 次移动或
+                 sync_interval_ms 毫秒 fsync 一次涉及的文件夹，strict 每次移动后立即 fsync；
+                 collision 为目标文件夹中已有同名文件时的处理方式：skip 跳过，overwrite 覆盖，rename 改名为
+                 "名称 (1).拓展名"(默认)，keep_newer 源文件较新时覆盖否则跳过，dedupe 内容相同时删除源文件否则改名；
+                 processes 为规划文件(筛选和分类)的进程数，"auto" 为全部 CPU，默认为1；
+                 只在按文件头识别、EXIF 日期等较重的规则下有收益)
+            "target_root": "D:/整理结果"  (可选，分类文件夹所在的根目录，默认为整理的文件夹)
+            "scan": {"recursive": True, "max_depth": 3, "include": ["*.jpg"], "exclude": ["*.tmp"], "incremental": True}
+                (可选，递归整理子文件夹；max_depth 为 null 时不限层数，include/exclude 为文件名通配符；
+                 incremental 为是否使用本地索引只处理上次整理后新增或变化的文件)
+            "duplicates": {"enabled": True, "action": "move", "folder": "重复文件", "workers": 4}
+                (可选，查找本次扫描到的内容相同的文件；action 为 move 时把除最早的一份之外的副本移入 folder，
+                 为 report 时只在 .fileorganizer 中写出报告)
+            "watch": {"settle_ms": 500, "poll_interval": 1.0}
+                (可选，监视模式下仍在写入的文件需要保持不变的毫秒数；不支持 inotify 时定期扫描的间隔秒数)
+            "metrics": {"enabled": True, "prometheus": "/var/lib/node_exporter/textfile/fileorganizer.prom"}
+                (可选，记录列出文件夹、stat、筛选、分类、mkdir、改名等各阶段的次数和耗时分布，结果中的 metrics 为报告；
+                 prometheus 为写出 Prometheus 文本格式的文件。多进程规划时筛选和分类在子进程中进行，不计时)
         }
     """
     def loadRules(self):
@@ -44,18 +173,15 @@ class FileOrganizer(QObject):
             self.rules = {
                 "classification_rule": {
                     "priority": ["default"],
-                    "default": {"enabled": True, "model": {
-                        "images": "图片", "videos": "视频", "documents": "文档", "others": "其他"
-                    }}
+                    "default": {"enabled": True,
+                                "images": True, "videos": True, "documents": True, "others": True}
                 },
                 "filter_rule": {}
             }
-            return True
         else:
             try:
                 with open(self.rules_json_filepath, "r", encoding="utf-8") as f:
                     self.rules = json.load(f)
-                    return True
             except (json.JSONDecodeError, KeyError) as e:
                 self.status_updated.emit(f"错误：规则文件 '{os.path.basename(self.rules_json_filepath)}' 格式无效: {e}")
                 return False
@@ -63,6 +189,15 @@ class FileOrganizer(QObject):
                 self.status_updated.emit(f"错误：无法读取规则文件: {e}")
                 return False
 
+        # 编译规则，整理时不再逐个文件解析规则
+        try:
+            self.categories = CategoryRegistry.from_rules(self.rules, warn=self.status_updated.emit)
+            self.compiled_rules = compile_rules(self.rules, warn=self.status_updated.emit, categories=self.categories)
+        except (AttributeError, TypeError) as e:
+            self.status_updated.emit(f"错误：规则文件 '{os.path.basename(self.rules_json_filepath)}' 格式无效: {e}")
+            return False
+        return True
+
     def organize(self):
         if not self.loadRules():
             self.status_updated.emit("整理规则读取失败！")
@@ -74,326 +209,833 @@ class FileOrganizer(QObject):
             self.finished.emit()
             return
 
+        self.target_dir = self.target_root or self.rules.get("target_root") or self.filepath
+        self.begin_metrics()
         self.status_updated.emit(f'准备整理位于 {self.filepath} 的文件...')
 
-        if not self.makefile_dir():
+        if not self.dry_run and not self.makefile_dir():
             self.finished.emit()
             return
 
         try:
-            # 获取文件夹中的全部文件
-            all_items = os.listdir(self.filepath)
-            filelist = [f for f in all_items if os.path.isfile(os.path.join(self.filepath, f))]
+            # 读取断点，规则改变后断点失效，重新开始
+            resume = None
+            self.checkpoint = None
+            self.resume_counters = None
+            self.last_record = None
+            if self.checkpoint_enabled() and not self.dry_run:
+                self.checkpoint = Checkpoint(state_dir(self.target_dir), self.filepath, rules_hash(self.rules))
+                resume = self.checkpoint.load()
+                if resume is not None:
+                    self.resume_counters = resume.get("counters", {})
+                    self.status_updated.emit(f"从上次中断的位置继续整理，"
+                                             f"已处理 {self.resume_counters.get('processed', 0)} 个文件")
+
+            # 增量整理：打开上次整理留下的索引
+            if self.incremental_enabled() and not self.dry_run:
+                index_path = os.path.join(state_dir(self.target_dir), f"index-{source_digest(self.filepath)}.sqlite")
+                self.index = DirectoryIndex(index_path, rules_hash(self.rules))
+
+            # 单次 scandir 扫描，得到全部文件的记录；递归模式下边遍历边整理，总数未知
+            records = self.scan_files(resume["position"] if resume else None)
+            self.duplicate_of = {}
+            if self.duplicates_options() is not None:
+                # 重复检测需要先得到全部文件
+                records = list(records)
+                self.detect_duplicates(records)
 
-            total_files = len(filelist)
+            total_files = len(records) if isinstance(records, list) else None
+            if total_files is not None and self.resume_counters:
+                total_files += self.resume_counters.get("processed", 0)
             if total_files == 0:
                 self.status_updated.emit("文件夹为空")
+                self.result = {"total": 0, "processed": 0, "moved": 0, "skipped": 0, "errors": 0, "bytes": 0,
+                               "error_messages": [], "stopped": False}
                 self.progress_updated.emit(100)
                 self.finished.emit()
                 return
 
-            classification_rules = self.rules.get("classification_rule", {})
-            filter_rules = self.rules.get("filter_rule", {})
-            priority = classification_rules.get("priority", [])
+            # 规划：先筛选，再按优先级分类；执行：按计划移动
+            journal_path = None
+            if self.journal_enabled() and not self.dry_run:
+                # 从断点继续时追加到原来的移动记录，撤销时可以一次撤销整个整理过程
+                journal_path = (resume and resume.get("journal")) or new_journal_path(self.target_dir, self.filepath)
+            self.execute_plan(self.iter_plan(records), total_files, journal_path)
+            if self.duplicates_options() is not None:
+                self.result["duplicates"] = len(self.duplicate_of)
+            if self.isRunning:
+                if self.checkpoint is not None:
+                    # 整理完成，断点不再需要
+                    self.checkpoint.clear()
+                if self.index is not None:
+                    # 只有完整的整理才更新索引
+                    self.index.finish()
 
-            processed_files = 0
-            # 开始整理
-            for filename in filelist:
-                if not self.isRunning:
-                    self.status_updated.emit("整理停止")
-                    self.finished.emit()
-                    return
-
-                self.status_updated.emit(f"正在整理 '{filename}' ")
-
-                # 先对文件进行筛选
-                passes_filters = True
-                # 时间筛选
-                if filter_rules.get("time", {}).get("enabled"):
-                    if not self.filter_by_time(filename):
-                        passes_filters = False
-                # 大小筛选
-                if passes_filters and filter_rules.get("size", {}).get("enabled"):
-                    if not self.filter_by_size(filename):
-                        passes_filters = False
-
-                if not passes_filters:
-                    # 判断下一个文件
-                    processed_files += 1
-                    continue
+        except Exception as e:
+            self.status_updated.emit(f"整理过程发生错误: \n{e}")
+            self.finished.emit()
+        finally:
+            self.reporter = None
+            if self.index is not None:
+                self.index.close()
+                self.index = None
+
+    # 监视模式：先整理已有的文件，之后持续整理新出现的文件，直到调用 stop
+    def watch(self):
+        if not self.loadRules():
+            self.status_updated.emit("整理规则读取失败！")
+            self.finished.emit()
+            return
+
+        if not os.path.isdir(self.filepath):
+            self.status_updated.emit(f"错误：文件夹 '{self.filepath}' 不存在！")
+            self.finished.emit()
+            return
 
-                # 对经过筛选的文件进行分类
-                moved = False
-                for rule_type in priority:
-                    rule_details = classification_rules.get(rule_type, {})
-                    if not rule_details.get("enabled"):
-                        continue  # 跳过未启用的规则
-
-                    # 检查文件是否符合当前规则
-                    does_match = False
-                    dest_folder_name = ""  # 目标文件夹名字
-
-                    if rule_type == "custom" and self.organize_by_custom(filename):
-                        does_match = True
-                        keywords = rule_details.get("keyword", [])
-                        name, ext = os.path.splitext(filename)
-                        for item in keywords:
-                            if (item.startswith('.') and item == ext) or (not item.startswith('.') and item in name):
-                                dest_folder_name = f'拓展名为{item}的文件' if item.startswith(
-                                    '.') else f'文件名中存在{item}的文件'
-                                break
-
-                    elif rule_type == "size" and self.organize_by_size(filename):
-                        does_match = True
-                        dest_folder_name = '按大小分类的文件'
-
-                    elif rule_type == "time" and self.organize_by_time(filename):
-                        does_match = True
-                        dest_folder_name = '按时间分类的文件'
-
-                    elif rule_type == "default":
-                        dest_folder_name = self.get_default_destination(filename)
-                        if dest_folder_name:
-                            if self.move_file(filename, dest_folder_name, category_prefix="default"):
-                                moved = True
-
-                    if does_match and dest_folder_name:
-                        if self.move_file(filename, dest_folder_name, category_prefix=rule_type):
-                            moved = True
-
-                    if moved:
-                        break
-
-                processed_files += 1
-                progress = int((processed_files / total_files) * 100)
-                self.progress_updated.emit(progress)
-
-            self.status_updated.emit('全部文件整理完成！')
+        self.target_dir = self.target_root or self.rules.get("target_root") or self.filepath
+        if not self.dry_run and not self.makefile_dir():
             self.finished.emit()
+            return
 
+        self.begin_metrics()
+        watch_options = self.rules.get("watch", {})
+        watcher = make_watcher(float(watch_options.get("poll_interval", 1.0)))
+        try:
+            self.checkpoint = None
+            self.resume_counters = None
+            self.last_record = None
+            self.status_updated.emit(f'正在监视 {self.filepath}，新文件会被自动整理...')
+            journal_path = (new_journal_path(self.target_dir, self.filepath)
+                            if self.journal_enabled() and not self.dry_run else None)
+            records = self.iter_watch(watcher, float(watch_options.get("settle_ms", 500)) / 1000)
+            self.execute_plan(self.iter_plan(records, parallel=False), None, journal_path)
         except Exception as e:
-            self.status_updated.emit(f"整理过程发生错误: \n{e}")
+            self.status_updated.emit(f"监视过程发生错误: \n{e}")
             self.finished.emit()
+        finally:
+            watcher.close()
+            self.reporter = None
 
+    # 产出监视的文件夹中已有的文件和之后新出现并已写完的文件
+    def iter_watch(self, watcher, settle):
+        recursive, options = self.get_scan_options()
+        max_depth = options["max_depth"]
+        include_match = compile_globs(options["include"])
+        exclude_match = compile_globs(options["exclude"])
+        skip_keys = {dir_key(path) for path in options["skip_dirs"]}
+        # 监视的文件夹 -> 相对整理文件夹的深度
+        depths = {}
 
+        def add_tree(path, depth):
+            # 先添加监视再扫描，两者之间新建的文件不会遗漏
+            stack = [(path, depth)]
+            while stack:
+                current, current_depth = stack.pop()
+                if not watcher.add(current):
+                    continue
+                depths[current] = current_depth
+                if not recursive or (max_depth is not None and current_depth >= max_depth):
+                    continue
+                try:
+                    with os.scandir(current) as entries:
+                        for entry in entries:
+                            if (entry.is_dir(follow_symlinks=False) and dir_key(entry.path) not in skip_keys
+                                    and not (exclude_match is not None and exclude_match(entry.name))):
+                                stack.append((entry.path, current_depth + 1))
+                except OSError:
+                    continue
 
-    # 创建文件夹函数
-    def makefile_dir(self):
-        # 根据规则创建所需文件夹
-        if not os.path.isdir(self.filepath):
-            self.status_updated.emit(f"错误: 目标文件夹 {self.filepath} 不存在哦。")
-            return False
+        def remaining_depth(depth):
+            return None if max_depth is None else max_depth - depth
 
+        add_tree(self.filepath, 0)
+        # 监视开始前已有的文件按普通整理处理
+        yield from walk_files(self.filepath, **options)
+
+        pending = SettleQueue(settle)
+        while self.isRunning:
+            now = time.monotonic()
+            for path, is_dir, complete in watcher.read(pending.timeout(now, WATCH_POLL_TIMEOUT)):
+                now = time.monotonic()
+                if path is RESCAN:
+                    # 事件队列溢出，重新扫描所有监视的文件夹
+                    for directory in watcher.watched():
+                        for record in walk_files(directory, include=options["include"], exclude=options["exclude"]):
+                            pending.add(record.path, False, now)
+                    continue
+                name = os.path.basename(path)
+                if exclude_match is not None and exclude_match(name):
+                    continue
+                if is_dir:
+                    parent_depth = depths.get(os.path.dirname(path))
+                    if (not recursive or parent_depth is None or dir_key(path) in skip_keys
+                            or (max_depth is not None and parent_depth >= max_depth)):
+                        continue
+                    # 新的子文件夹：添加监视，其中已有的文件可能仍在写入，同样等待稳定
+                    add_tree(path, parent_depth + 1)
+                    for record in walk_files(path, max_depth=remaining_depth(parent_depth + 1),
+                                             include=options["include"], exclude=options["exclude"],
+                                             skip_dirs=options["skip_dirs"]):
+                        pending.add(record.path, False, now)
+                    continue
+                if include_match is not None and not include_match(name):
+                    continue
+                pending.add(path, complete, now)
+            yield from pending.ready(time.monotonic())
+            # 长时间没有新文件时，也要按时把已完成的移动写入磁盘
+            if self.syncer is not None:
+                self.syncer.flush_due()
+            if self.journal is not None:
+                self.journal.flush_due()
+
+    # 应用之前导出的移动计划
+    def apply_plan(self, plan_filepath):
+        if not os.path.isfile(plan_filepath):
+            self.status_updated.emit(f"错误：计划文件 '{plan_filepath}' 不存在！")
+            self.finished.emit()
+            return
+
+        self.begin_metrics()
+        self.status_updated.emit(f'准备应用移动计划 {plan_filepath} ...')
         try:
-            classification_rules = self.rules.get("classification_rule", {})
-            if not classification_rules:
-                return True
-
-            # 获取优先级列表
-            priority = classification_rules.get("priority", [])
-
-            # 默认规则映射
-            default_name_map = {
-                "images": "图片",
-                "videos": "视频",
-                "documents": "文档",
-                "others": "其他"
-            }
+            # 移动记录放在 target_root 下，未指定时放在计划文件旁边
+            journal_dir = self.target_root or os.path.dirname(os.path.abspath(plan_filepath))
+            journal_path = (new_journal_path(journal_dir, plan_filepath)
+                            if self.journal_enabled() and not self.dry_run else None)
+            self.execute_plan(read_plan(plan_filepath), None, journal_path)
+        except Exception as e:
+            self.status_updated.emit(f"应用计划时发生错误: \n{e}")
+            self.finished.emit()
+        finally:
+            self.reporter = None
 
-            # 按照优先级创建文件夹
-            for rule_type in priority:
-                rule_details = classification_rules.get(rule_type, {})
-
-                if rule_details.get("enabled"):
-                    if rule_type == "default":
-                        # 检查每一个分类（images, videos...）是不是True
-                        for key, folder_name in default_name_map.items():
-                            if rule_details.get(key):
-                                dir_path = os.path.join(self.filepath, folder_name)
-                                os.makedirs(dir_path, exist_ok=True)
-
-                    elif rule_type == "custom":
-                        keywords = rule_details.get("keyword", [])
-                        for item in keywords:
-                            folder_name = ''
-                            if item.startswith('.'):
-                                folder_name = f'拓展名为{item}的文件'
-                            else:
-                                folder_name = f'文件名中存在{item}的文件'
-
-                            if folder_name:
-                                dir_path = os.path.join(self.filepath, folder_name)
-                                os.makedirs(dir_path, exist_ok=True)
-
-                    elif rule_type == "size":
-                        dir_path = os.path.join(self.filepath, '按大小分类的文件')
-                        os.makedirs(dir_path, exist_ok=True)
-
-                    elif rule_type == "time":
-                        dir_path = os.path.join(self.filepath, '按时间分类的文件')
-                        os.makedirs(dir_path, exist_ok=True)
+    # 撤销一次整理：倒序读取移动记录，把文件移回原处。已撤销的记录保存在 .undone 文件中，中断后可以继续
+    def undo(self, journal_filepath):
+        if not os.path.isfile(journal_filepath):
+            self.status_updated.emit(f"错误：移动记录 '{journal_filepath}' 不存在！")
+            self.finished.emit()
+            return
 
-            return True
+        self.begin_metrics()
+        self.status_updated.emit(f'准备撤销 {journal_filepath} 中的移动...')
+        done_path = journal_filepath + ".undone"
+        undone = set()
+        if os.path.isfile(done_path):
+            with open(done_path, "r", encoding="utf-8") as f:
+                undone = {int(line) for line in f if line.strip().isdigit()}
 
+        done_log = None if self.dry_run else BatchedLog(done_path)
+        # 撤销后尝试删除变空的分类文件夹
+        emptied_dirs = set()
+
+        def on_undone(entry):
+            emptied_dirs.add(os.path.dirname(entry.source))
+            if done_log is not None:
+                done_log.append(str(entry.index))
+
+        self.on_moved = on_undone
+        try:
+            self.execute_plan(self.iter_undo(journal_filepath, undone), None)
         except Exception as e:
-            self.status_updated.emit(f"创建文件夹时出错: {e}")
-            return False
+            self.status_updated.emit(f"撤销过程发生错误: \n{e}")
+            self.finished.emit()
+        finally:
+            self.on_moved = None
+            self.reporter = None
+            if done_log is not None:
+                done_log.close()
+            if not self.dry_run:
+                for folder in emptied_dirs:
+                    try:
+                        os.rmdir(folder)
+                    except OSError:
+                        pass
+
+    # 倒序产出撤销用的移动，index 为记录从末尾数起的序号
+    def iter_undo(self, journal_filepath, undone):
+        for index, line in enumerate(read_lines_reversed(journal_filepath)):
+            if index in undone:
+                self.reporter.file_skipped()
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                # 程序崩溃时最后一行可能不完整
+                self.reporter.file_skipped()
+                continue
+            # 因内容相同而删除的文件需要复制回来，而不是移回
+            rule = "restore" if data.get("dedupe") else "undo"
+            yield UndoEntry(data["dst"], data["src"], rule, data.get("size", 0), index)
+
+    # 对扫描记录逐个规划，产出需要移动的 PlanEntry，不需要移动的文件计为跳过；
+    # parallel 为 False 时不使用进程池(监视模式下文件逐个到达，不适合按块规划)
+    def iter_plan(self, records, parallel=True):
+        self.last_checkpoint = time.monotonic()
+        duplicates = self.duplicates_options()
+        # 需要移走副本时的目标文件夹
+        duplicates_dir = None
+        if duplicates is not None and duplicates["action"] == "move":
+            duplicates_dir = os.path.join(self.target_dir, duplicates["folder"])
+        for record, planned in self.iter_planned(records, parallel):
+            if self.checkpoint is not None:
+                self.maybe_checkpoint()
+            self.last_record = record
+            if duplicates_dir is not None and record.path in self.duplicate_of and self.compiled_rules.accepts(record):
+                yield PlanEntry(record.path, os.path.join(duplicates_dir, record.name), "duplicate", record.size)
+                continue
+            if planned is None:
+                self.reporter.file_skipped()
+                if self.index is not None:
+                    self.index.remember(record)
+                continue
+            rule_type, dest_folder_name = planned
+            source = record.path or os.path.join(self.filepath, record.name)
+            destination = os.path.join(self.target_dir, dest_folder_name, record.name)
+            yield PlanEntry(source, destination, rule_type, record.size)
+
+    # 产出 (记录, 规划结果)，进程数大于1时由进程池按块规划，顺序不变
+    def iter_planned(self, records, parallel=True):
+        processes = self.get_processes() if parallel else 1
+        if processes > 1:
+            return iter_plan_parallel(records, self.compiled_rules, processes)
+        return ((record, self.plan_file(record)) for record in records)
+
+    # 执行移动计划，total 为文件总数，未知时为None；journal_path 不为None时记录每次移动
+    def execute_plan(self, entries, total, journal_path=None):
+        self.reporter = ProgressReporter(total, self.status_updated.emit, self.progress_updated.emit,
+                                         interval=self.report_interval)
+        if self.resume_counters:
+            self.reporter.restore(self.resume_counters)
+        self.created_dirs = set()
+        self.dest_names = {}
+        self.next_suffix = {}
+        self.collision_policy = None
+        self.syncer = None if self.dry_run else self.get_syncer()
+        self.journal_path = journal_path if not self.dry_run else None
+        if self.journal_path:
+            # batched 模式下目录项的 fsync 是攒批进行的，写入记录前先让其中的移动落盘，
+            # 记录中不会出现断电后可能丢失的移动
+            self.journal = Journal(journal_path, before_flush=self.syncer.flush)
+
+        # 需要导出计划时边执行边写出
+        writer = PlanWriter(self.plan_path) if self.plan_path else None
+
+        # 网络文件系统上可以用多个线程并发移动
+        executor = None
+        workers = self.get_workers()
+        if workers > 1 and not self.dry_run:
+            executor = MoveExecutor(self.move_entry, workers)
+        self.executor = executor
 
-    # 通用移动函数
-    def move_file(self, filename, dest_folder_name, category_prefix=""):
-        if not self.isRunning: return False
         try:
-            old_path = os.path.join(self.filepath, filename)
-            if not os.path.exists(old_path): return False
+            for entry in entries:
+                if not self.isRunning:
+                    break
+                if writer is not None:
+                    writer.write(entry)
+                if executor is not None:
+                    # 同一目标文件夹的移动由同一个线程按顺序执行
+                    executor.submit(os.path.dirname(entry.destination), entry)
+                else:
+                    self.move_entry(entry)
+        finally:
+            if executor is not None:
+                if not self.isRunning:
+                    executor.cancel()
+                executor.join()
+            self.executor = None
+            if writer is not None:
+                writer.close()
+            # 先让移动结果落盘，再写入移动记录
+            if self.syncer is not None:
+                self.syncer.flush()
+                self.syncer = None
+            if self.journal is not None:
+                self.journal.close()
+                self.journal = None
 
-            dest_dir = os.path.join(self.filepath, dest_folder_name)
-            os.makedirs(dest_dir, exist_ok=True)
-            new_path = os.path.join(dest_dir, filename)
+        # 最后发送一次完整的进度和汇总
+        self.reporter.tick(force=True)
+        self.result = self.reporter.counters()
+        self.result["stopped"] = not self.isRunning
+        if journal_path and not self.dry_run and os.path.isfile(journal_path):
+            # 没有移动任何文件时记录文件已被删除
+            self.result["journal"] = journal_path
+        if self.metrics is not None:
+            self.finish_metrics()
+        if total is None and self.isRunning:
+            self.progress_updated.emit(100)
+        if not self.isRunning:
+            self.status_updated.emit(f"整理停止，{self.reporter.summary()}")
+        else:
+            self.status_updated.emit(f'全部文件整理完成！{self.reporter.summary()}')
+        self.finished.emit()
 
-            status_msg = f"正在移动 [{category_prefix}] {filename}" if category_prefix else f"正在移动 {filename}"
-            self.status_updated.emit(status_msg)
+    # 按设置开始记录分阶段耗时，未开启时 self.metrics 为None
+    def begin_metrics(self):
+        enabled = self.metrics_option
+        if enabled is None:
+            enabled = self.rules.get("metrics", {}).get("enabled", False)
+        self.metrics = StageMetrics() if enabled else None
 
-            os.rename(old_path, new_path)
-            return True
-        except Exception as e:
-            self.status_updated.emit(f"移动文件 {filename} 时出错: {e}")
-            return False
+    # 把耗时报告加入结果，需要时写出 Prometheus 文件
+    def finish_metrics(self):
+        self.result["metrics"] = self.metrics.report()
+        path = self.metrics_path or self.rules.get("metrics", {}).get("prometheus")
+        if not path:
+            return
+        labels = {"folder": self.filepath} if self.filepath else None
+        try:
+            self.metrics.write_prometheus(path, labels, self.result)
+        except OSError as e:
+            self.status_updated.emit(f"写入指标文件 {path} 时出错: {e}")
 
-    def organize_by_custom(self, filename):
-        classification_rule = self.rules["classification_rule"]
-        custom = classification_rule.get("custom", {})
-        if not custom.get("enabled", True):
-            return False
+    # 读取并发移动的线程数
+    def get_workers(self):
+        if self.workers is not None:
+            return max(1, int(self.workers))
         try:
-            keywords = custom.get("keyword", [])
-            name, ext = os.path.splitext(filename)
-            for keyword in keywords:
-                if keyword.startswith("."):
-                    if keyword == ext:
-                        return True
-                elif keyword in name:
-                    return True
-            return False
-        except Exception as e:
-            self.status_updated.emit(f"按自定义规则分类 {filename} 时出错: {e}")
-            return False
+            return max(1, int(self.rules.get("execution", {}).get("workers", 1)))
+        except (TypeError, ValueError):
+            return 1
 
-    def organize_by_size(self, filename):
-        classification_rule = self.rules["classification_rule"]
-        size = classification_rule.get("size", {})
-        if not size.get("enabled", True):
-            return False
+    # 到达间隔时保存断点：等待已提交的移动全部完成，此时 last_record 之前的文件都已处理
+    # 整理停止后不再保存：停止之后 move_entry 直接返回，last_record 及排队中的文件可能并未移动
+    def maybe_checkpoint(self):
+        if not self.isRunning or self.last_record is None or \
+                time.monotonic() - self.last_checkpoint < self.checkpoint_interval:
+            return
+        if self.executor is not None:
+            self.executor.wait_idle()
+        if not self.isRunning:
+            # 等待期间整理停止，已提交的移动可能被丢弃；停止标记不会复位，此处仍在运行说明之前的移动都已完成
+            return
+        if self.syncer is not None:
+            self.syncer.flush()
+        if self.journal is not None:
+            self.journal.flush()
+        self.checkpoint.save(file_position(self.filepath, self.last_record.path), self.reporter.counters(),
+                             self.journal_path)
+        self.last_checkpoint = time.monotonic()
+
+    # 读取重复检测设置，未启用时返回None
+    def duplicates_options(self):
+        options = self.rules.get("duplicates", {})
+        if not options.get("enabled"):
+            return None
+        return {
+            "action": "report" if options.get("action") == "report" else "move",
+            "folder": options.get("folder") or DUPLICATES_FOLDER,
+            "workers": options.get("workers") or min(8, os.cpu_count() or 1),
+        }
+
+    # 查找重复文件，结果保存在 duplicate_of 中
+    def detect_duplicates(self, records):
+        options = self.duplicates_options()
+        self.status_updated.emit("正在查找重复文件...")
+        cache = None if self.dry_run else HashCache(os.path.join(state_dir(self.target_dir), "hashes.sqlite"))
+        start = time.perf_counter()
         try:
-            old_path = os.path.join(self.filepath, filename)
-            file_size = os.path.getsize(old_path) / (1024 * 1024)
-            model = size.get("model")
-            value1 = size.get("value1")
-            value2 = size.get("value2")
-            if model == "大于":
-                if file_size > value1:
-                    return True
-            elif model == "小于":
-                if file_size < value2:
-                    return True
-            elif model == "介于":
-                if value1 < file_size < value2:
-                    return True
-            return False
-        except (TypeError, ValueError) as e:
-            self.status_updated.emit(f"按大小分类时出错: 规则中的值无效 - {e}")
-            return False
+            groups = find_duplicates(records, cache, int(options["workers"]))
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe("duplicates", time.perf_counter() - start)
+            if cache is not None:
+                cache.close()
+        for group in groups:
+            for record in group[1:]:
+                self.duplicate_of[record.path] = group[0].path
+        if not groups:
+            return
+        message = f"发现 {len(groups)} 组重复文件，共 {len(self.duplicate_of)} 个副本"
+        if options["action"] == "report" and not self.dry_run:
+            report_path = os.path.join(state_dir(self.target_dir), time.strftime("duplicates-%Y%m%d-%H%M%S.json"))
+            with open(report_path, "w", encoding="utf-8") as f:
+                json.dump([{"original": group[0].path, "size": group[0].size,
+                            "duplicates": [record.path for record in group[1:]]} for group in groups],
+                          f, ensure_ascii=False, indent=2)
+            message += f"，报告已写入 {report_path}"
+        self.status_updated.emit(message)
+
+    # 读取规划文件的进程数，"auto" 表示使用全部可用的 CPU
+    def get_processes(self):
+        value = self.processes if self.processes is not None else \
+            self.rules.get("execution", {}).get("processes", 1)
+        if value == "auto":
+            return default_processes()
+        try:
+            return max(1, int(value))
+        except (TypeError, ValueError):
+            return 1
+
+    # 读取重名处理方式，默认加编号改名
+    def get_collision_policy(self):
+        if self.collision_policy is None:
+            policy = self.rules.get("execution", {}).get("collision", "rename")
+            if policy not in COLLISION_POLICIES:
+                self.report(f"未知的重名处理方式 '{policy}'，改用 rename")
+                policy = "rename"
+            self.collision_policy = policy
+        return self.collision_policy
+
+    # 按设置创建持久化用的 DirectorySync
+    def get_syncer(self):
+        execution = self.rules.get("execution", {})
+        mode = self.durability or execution.get("durability", "fast")
+        if mode not in DURABILITY_MODES:
+            self.status_updated.emit(f"未知的持久化模式 '{mode}'，改用 fast")
+            mode = "fast"
+        try:
+            batch_size = max(1, int(execution.get("sync_batch", 256)))
+            interval = max(0.0, float(execution.get("sync_interval_ms", 200)) / 1000)
+        except (TypeError, ValueError):
+            batch_size, interval = 256, 0.2
+        return DirectorySync(mode, batch_size, interval)
+
+    # 是否增量整理
+    def incremental_enabled(self):
+        if self.incremental is not None:
+            return bool(self.incremental)
+        return bool(self.rules.get("scan", {}).get("incremental", False))
+
+    # 是否定期保存断点
+    def checkpoint_enabled(self):
+        if self.checkpoint_option is not None:
+            return bool(self.checkpoint_option)
+        return bool(self.rules.get("execution", {}).get("checkpoint", False))
 
-    def organize_by_time(self, filename):
-        classification_rule = self.rules["classification_rule"]
-        time = classification_rule.get("time", {})
-        if not time.get("enabled", True):
+    # 是否记录移动操作
+    def journal_enabled(self):
+        return bool(self.rules.get("execution", {}).get("journal", True))
+
+    # 发送附加的状态消息，整理过程中由 reporter 合并后发送
+    def report(self, message):
+        if self.reporter is not None:
+            self.reporter.message(message)
+        else:
+            self.status_updated.emit(message)
+
+    # 错误消息：整理过程中同时保存到结果的 error_messages 中
+    def report_error(self, message):
+        if self.reporter is not None:
+            self.reporter.error(message)
+        else:
+            self.status_updated.emit(message)
+
+    # 移动一个已规划的文件并更新计数
+    def move_entry(self, entry):
+        if not self.isRunning:
+            # 整理已停止，不再计数
             return False
+        if self.dry_run:
+            status, destination = "moved", entry.destination
+        else:
+            # 计时包括重名处理、创建文件夹和改名
+            with self.metrics.time("move") if self.metrics is not None else nullcontext():
+                status, destination = self.place_file(entry)
+            if self.index is not None:
+                if status == "failed" or status == "gone":
+                    self.index.mark_dirty(os.path.dirname(entry.source))
+                elif status != "skipped":
+                    self.index.mark_moved(os.path.dirname(entry.source))
+            if status in ("moved", "deduped") and self.syncer is not None:
+                # 源文件夹和目标文件夹的目录项都发生了变化
+                self.syncer.touch(os.path.dirname(entry.source), os.path.dirname(destination))
+            if status == "moved":
+                if destination != entry.destination:
+                    entry = entry._replace(destination=destination)
+                if self.journal is not None:
+                    self.journal.record(entry.source, destination, entry.size)
+                if self.on_moved is not None:
+                    self.on_moved(entry)
+            elif status == "deduped" and self.journal is not None:
+                # 内容相同的源文件已删除，撤销时从目标文件复制回来
+                self.journal.record(entry.source, destination, entry.size, dedupe=True)
+        if self.reporter is not None:
+            if status == "moved":
+                self.reporter.file_moved(entry.size)
+            elif status == "failed":
+                self.reporter.file_failed()
+            else:
+                # 包括扫描之后已被删除或移走的文件(gone)
+                self.reporter.file_skipped()
+        return status == "moved"
+
+    # 按重名处理方式移动文件，返回 (结果, 实际目标路径)，结果为 moved/skipped/deduped/gone/failed，
+    # gone 表示源文件在扫描之后已被删除或移走
+    def place_file(self, entry):
+        source, destination = entry.source, entry.destination
+        policy = self.get_collision_policy()
+        if entry.rule == "restore":
+            return self.restore_file(source, destination)
+        if policy == "overwrite":
+            return self.move_file(source, destination), destination
+
+        dest_dir, name = os.path.split(destination)
         try:
-            old_path = os.path.join(self.filepath, filename)
-            file_time = os.path.getmtime(old_path)
-            start_time = time.get("start_time")
-            end_time = time.get("end_time")
-            if start_time < file_time < end_time:
-                return True
+            self.ensure_dir(dest_dir)
+            names = self.dest_listing(dest_dir)
+        except OSError as e:
+            self.report_error(f"移动文件 {os.path.basename(source)} 时出错: {e}")
+            return "failed", destination
+        while self.isRunning:
+            if (os.path.normcase(name) in names and policy in ("keep_newer", "dedupe")
+                    and not os.path.lexists(destination)):
+                # 列出之后同名文件已被删除，这两种方式需要比较文件，先确认一次
+                names.discard(os.path.normcase(name))
+            if os.path.normcase(name) in names:
+                # 目标文件夹中已有同名文件
+                if policy == "skip":
+                    return "skipped", destination
+                if policy == "keep_newer":
+                    if self.is_newer(source, destination):
+                        return self.move_file(source, destination), destination
+                    return "skipped", destination
+                if policy == "dedupe" and self.same_content(source, destination):
+                    try:
+                        os.unlink(source)
+                    except FileNotFoundError:
+                        return "gone", destination
+                    except OSError as e:
+                        self.report_error(f"删除重复文件 {os.path.basename(source)} 时出错: {e}")
+                        return "failed", destination
+                    return "deduped", destination
+                name = self.free_name(dest_dir, name, names)
+                destination = os.path.join(dest_dir, name)
+            try:
+                status = self.move_file(source, destination, replace=False)
+            except FileExistsError:
+                # 列出文件夹之后才出现的同名文件
+                names.add(os.path.normcase(name))
+                continue
+            if status != "moved":
+                return status, destination
+            names.add(os.path.normcase(name))
+            source_names = self.dest_names.get(os.path.dirname(source))
+            if source_names is not None:
+                source_names.discard(os.path.normcase(os.path.basename(source)))
+            return "moved", destination
+        return "failed", destination
+
+    # 撤销重复文件删除：把保留的文件复制回原处，原处已有文件时跳过
+    def restore_file(self, source, destination):
+        try:
+            self.ensure_dir(os.path.dirname(destination))
+            if os.path.lexists(destination):
+                return "skipped", destination
+            shutil.copy2(source, destination)
+        except OSError as e:
+            self.report_error(f"恢复文件 {os.path.basename(destination)} 时出错: {e}")
+            return "failed", destination
+        return "moved", destination
+
+    # 目标文件夹中已有的文件名，每个文件夹每次整理只列出一次
+    def dest_listing(self, folder):
+        names = self.dest_names.get(folder)
+        if names is None:
+            names = {os.path.normcase(name) for name in os.listdir(folder)}
+            with self.dest_names_lock:
+                names = self.dest_names.setdefault(folder, names)
+        return names
+
+    # 在已有文件名中找一个空闲的 "名称 (n).拓展名"
+    def free_name(self, folder, name, names):
+        stem, ext = os.path.splitext(name)
+        key = (folder, os.path.normcase(name))
+        number = self.next_suffix.get(key, 1)
+        candidate = f"{stem} ({number}){ext}"
+        while os.path.normcase(candidate) in names:
+            number += 1
+            candidate = f"{stem} ({number}){ext}"
+        self.next_suffix[key] = number + 1
+        return candidate
+
+    @staticmethod
+    def is_newer(source, destination):
+        try:
+            return os.stat(source).st_mtime > os.stat(destination).st_mtime
+        except OSError:
             return False
-        except Exception as e:
-            self.status_updated.emit(f"按时间分类 {filename} 时出错: {e}")
+
+    @staticmethod
+    def same_content(source, destination):
+        try:
+            return filecmp.cmp(source, destination, shallow=False)
+        except OSError:
             return False
 
-    def get_default_destination(self, filename):
-        # 根据预设规则判断文件应被移动到哪个文件夹，返回文件夹名或None
-        classification_rule = self.rules.get("classification_rule", {})
-        default_rules = classification_rule.get("default", {})
-
-        name, ext = os.path.splitext(filename)
-        ext = ext.lower()  # 统一使用小写后缀名进行判断
-
-        # 检查各个类别是否启用，并进行匹配
-        if default_rules.get("images") and ext in ['.jpg', '.png', '.gif', '.jpeg', '.bmp', '.svg']:
-            return "图片"
-        if default_rules.get("videos") and ext in ['.mp4', '.mov', '.avi', '.mkv', '.wmv']:
-            return "视频"
-        if default_rules.get("documents") and ext in ['.txt', '.doc', '.docx', '.rtf', '.xlsx', '.xls', '.ppt', '.pptx',
-                                                      '.pdf']:
-            return "文档"
-
-        # 如果启用了“其他”分类，并且文件不属于上述任何一类，则归为“其他”
-        if default_rules.get("others"):
-            all_known_exts = {
-                '.jpg', '.png', '.gif', '.jpeg', '.bmp', '.svg',
-                '.mp4', '.mov', '.avi', '.mkv', '.wmv',
-                '.txt', '.doc', '.docx', '.rtf', '.xlsx', '.xls', '.ppt', '.pptx', '.pdf'
-            }
-            if ext not in all_known_exts:
-                return "其他"
+    # 读取扫描设置，返回 (是否递归, walk_files 的参数)
+    def get_scan_options(self):
+        scan = self.rules.get("scan", {})
+        recursive = bool(scan.get("recursive"))
+        max_depth = scan.get("max_depth") if recursive else 0
+        skip_dirs = []
+        if recursive:
+            # 跳过分类文件夹，避免重复整理已经分类的文件
+            skip_dirs = [os.path.join(self.target_dir, folder_name) for folder_name in self.category_folders()]
+            if dir_key(self.target_dir) != dir_key(self.filepath):
+                skip_dirs.append(self.target_dir)
+            # 整理程序自己的记录文件
+            skip_dirs.append(state_dir(self.target_dir))
+        return recursive, {
+            "max_depth": max_depth,
+            "include": scan.get("include"),
+            "exclude": scan.get("exclude"),
+            "skip_dirs": skip_dirs,
+        }
+
+    # 扫描文件夹，一次 scandir 遍历，每个文件最多 stat 一次；递归模式下返回生成器
+    # resume_after 为断点位置，保存断点时按文件名排序遍历
+    def scan_files(self, resume_after=None):
+        recursive, options = self.get_scan_options()
+        records = walk_files(self.filepath, ordered=self.checkpoint is not None, resume_after=resume_after,
+                             index=self.index, metrics=self.metrics, **options)
+        if recursive:
+            return records
+        return list(records)
+
+    # 规划单个文件：返回 (规则类型, 目标文件夹名)，不需要移动时返回None
+    def plan_file(self, record):
+        if self.metrics is not None:
+            return self.compiled_rules.plan_timed(record, self.metrics.observe)
+        return self.compiled_rules.plan(record)
+
+    # 根据规则得到需要的分类文件夹名
+    def category_folders(self):
+        folders = []
+        classification_rules = self.rules.get("classification_rule", {})
+        if not classification_rules:
+            return folders
+
+        # 获取优先级列表
+        priority = classification_rules.get("priority", [])
+
+        # 按照优先级列出文件夹
+        for rule_type in priority:
+            rule_details = classification_rules.get(rule_type, {})
+
+            if rule_details.get("enabled"):
+                if rule_type == "default":
+                    # 预设分类表中启用的分类，最后是"其他"
+                    for key, folder_name in self.categories.enabled_folders(rule_details):
+                        folders.append(folder_name)
+                    if rule_details.get("others"):
+                        folders.append(OTHERS_FOLDER)
+
+                elif rule_type == "custom":
+                    keywords = rule_details.get("keyword", [])
+                    for item in keywords:
+                        folders.append(custom_folder_name(item))
 
-        return None  # 如果不匹配任何启用的规则，返回None
+                elif rule_type == "size":
+                    folders.append('按大小分类的文件')
 
-    # 筛选时间
-    def filter_by_time(self,filename):
-        filter_rule = self.rules.get("filter_rule", {})
-        time_filter = filter_rule.get("time", {})
-        if not time_filter.get("enabled", True):
+                elif rule_type == "time":
+                    folders.append(time_folder(rule_details))
+
+        duplicates = self.duplicates_options()
+        if duplicates is not None and duplicates["action"] == "move":
+            folders.append(duplicates["folder"])
+
+        return folders
+
+    # 检查要整理的文件夹并创建目标根目录，分类文件夹在第一次移入文件时才创建
+    def makefile_dir(self):
+        if not os.path.isdir(self.filepath):
+            self.status_updated.emit(f"错误: 目标文件夹 {self.filepath} 不存在哦。")
             return False
+
         try:
-            old_path = os.path.join(self.filepath, filename)
-            file_time = os.path.getmtime(old_path)
-            start_time = time_filter.get("start_time")
-            end_time = time_filter.get("end_time")
-            if not start_time or not end_time:
-                return False
-            if start_time <= file_time <= end_time:
-                return True
-            else:
-                return False
+            os.makedirs(self.target_dir, exist_ok=True)
+            return True
+
         except Exception as e:
-            self.status_updated.emit(f"按时间筛选 {filename} 时出错: {e}")
-        return False
-
-    # 筛选大小
-    def filter_by_size(self, filename):
-        filter_rule = self.rules.get("filter_rule", {})
-        size_filter = filter_rule.get("size", {})
-        if not size_filter.get("enabled", True):
+            self.status_updated.emit(f"创建文件夹时出错: {e}")
             return False
-        else:
+
+    # 确保目标文件夹存在，每个文件夹每次整理最多调用一次 mkdir
+    def ensure_dir(self, path):
+        if path in self.created_dirs:
+            return
+        try:
+            if self.metrics is not None:
+                with self.metrics.time("mkdir"):
+                    os.mkdir(path)
+            else:
+                os.mkdir(path)
+            # 新建的文件夹是空的，不需要再列出
+            self.dest_names.setdefault(path, set())
+            if self.syncer is not None:
+                self.syncer.touch(os.path.dirname(path))
+            if self.index is not None:
+                # 新建文件夹改变了上级文件夹的修改时间，整理结束时重新读取
+                self.index.mark_moved(os.path.dirname(path))
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            # 上级文件夹也不存在
+            os.makedirs(path, exist_ok=True)
+        self.created_dirs.add(path)
+
+    # 通用移动函数，返回 moved、gone(源文件已不存在) 或 failed；replace 为 False 时目标已存在则抛出 FileExistsError
+    def move_file(self, old_path, new_path, replace=True):
+        if not self.isRunning: return "failed"
+        filename = os.path.basename(old_path)
+        dest_dir = os.path.dirname(new_path)
+        try:
+            self.ensure_dir(dest_dir)
+
+            rename = os.replace if replace else rename_noreplace
+            if self.metrics is not None:
+                rename = self.timed_rename(rename)
             try:
-                old_path = os.path.join(self.filepath, filename)
-                file_size = os.path.getsize(old_path) / (1024 * 1024)
-                model = size_filter.get("model")
-                value1 = float(size_filter.get("value1"))
-                value2 = float(size_filter.get("value2"))
-                if model == "大于":
-                    if file_size > value1:
-                        return True
-                elif model == "小于":
-                    if file_size < value2:
-                        return True
-                elif model == "介于":
-                    if value1 < file_size < value2:
-                        return True
-                return False
-            except (TypeError, ValueError) as e:
-                self.status_updated.emit(f"按大小筛选时出错: 规则中的值无效 - {e}")
-                return False
+                try:
+                    rename(old_path, new_path)
+                except FileNotFoundError:
+                    if not os.path.exists(old_path):
+                        raise
+                    # 目标文件夹在整理过程中被删除(例如监视模式下)，重新创建
+                    self.created_dirs.discard(dest_dir)
+                    self.dest_names.pop(dest_dir, None)
+                    self.ensure_dir(dest_dir)
+                    rename(old_path, new_path)
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+                # 目标位于其他磁盘，改为复制后删除
+                self.move_to_other_device(filename, old_path, new_path, replace)
+            return "moved"
+        except FileNotFoundError:
+            # 文件在扫描之后已被移走
+            return "gone"
+        except FileExistsError:
+            if not replace:
+                raise
+            self.report_error(f"移动文件 {filename} 时出错: 目标已存在")
+            return "failed"
+        except Exception as e:
+            self.report_error(f"移动文件 {filename} 时出错: {e}")
+            return "failed"
+
+    # 记录每次改名(包括失败的)的耗时
+    def timed_rename(self, rename):
+        observe = self.metrics.observe
+
+        def timed(old_path, new_path):
+            start = time.perf_counter()
+            try:
+                rename(old_path, new_path)
+            finally:
+                observe("rename", time.perf_counter() - start)
+        return timed
 
+    # 跨设备移动，并报告吞吐量
+    def move_to_other_device(self, filename, old_path, new_path, replace=True):
+        start = time.perf_counter()
+        copied = move_across_devices(old_path, new_path, replace)
+        elapsed = time.perf_counter() - start
+        if self.metrics is not None:
+            self.metrics.observe("copy", elapsed)
+        size_mb = copied / (1024 * 1024)
+        speed = size_mb / elapsed if elapsed > 0 else 0.0
+        self.report(f"已跨磁盘移动 {filename}: {size_mb:.1f} MB, {speed:.1f} MB/s")
@@ -0,0 +1,79 @@
+# parallel.py
+# 多进程规划：文件判断较重(按文件头识别、EXIF 日期、大量关键词)时，单个线程受 GIL 限制。
+# 把扫描记录按块发送给进程池，每个进程只返回需要移动的 (块内序号, 规则类型, 文件夹名)，
+# 移动仍在主进程中按原顺序执行
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from rules import FileRecord
+
+# 每块的记录数
+CHUNK_SIZE = 1024
+
+# 子进程中的判定流水线，由 _init_worker 设置
+_compiled_rules = None
+
+
+def _init_worker(compiled_rules):
+    global _compiled_rules
+    _compiled_rules = compiled_rules
+
+
+def _plan_chunk(rows):
+    # 记录以普通元组发送，pickle 比 namedtuple 快得多
+    plan = _compiled_rules.plan
+    results = []
+    for index, row in enumerate(rows):
+        planned = plan(FileRecord._make(row))
+        if planned is not None:
+            results.append((index, planned[0], planned[1]))
+    return results
+
+
+def _chunks(records, size):
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _expand(chunk, results):
+    # 把块的结果还原为 (记录, 规划结果)，不需要移动的记录对应None
+    planned = {index: (rule_type, folder) for index, rule_type, folder in results}
+    for index, record in enumerate(chunk):
+        yield record, planned.get(index)
+
+
+def iter_plan_parallel(records, compiled_rules, processes, chunk_size=CHUNK_SIZE):
+    """
+    按原顺序产出 (记录, 规划结果)
+        同时在途的块数为进程数的两倍，递归扫描时内存占用仍然有上限；
+        compiled_rules 需要可以 pickle，进程启动时发送一次
+    """
+    pool = ProcessPoolExecutor(max(1, processes), initializer=_init_worker, initargs=(compiled_rules,))
+    in_flight = deque()
+    try:
+        for chunk in _chunks(records, chunk_size):
+            in_flight.append((chunk, pool.submit(_plan_chunk, [tuple(record) for record in chunk])))
+            if len(in_flight) >= processes * 2:
+                chunk, future = in_flight.popleft()
+                yield from _expand(chunk, future.result())
+        while in_flight:
+            chunk, future = in_flight.popleft()
+            yield from _expand(chunk, future.result())
+    finally:
+        # 整理停止时不再等待未开始的块
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def default_processes():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
@@ -0,0 +1,67 @@
+# plan.py
+# 移动计划：规划阶段只计算每个文件的 (源路径, 目标路径, 匹配的规则)，不改动磁盘。
+# 计划以 JSONL 或 CSV 流式写出，可以稍后再由执行器应用，也可以对比不同规则版本产生的计划
+
+import csv
+import json
+import os
+from collections import namedtuple
+
+PlanEntry = namedtuple("PlanEntry", ["source", "destination", "rule", "size"])
+
+# 撤销时使用，index 为该移动在记录文件中从末尾数起的序号
+UndoEntry = namedtuple("UndoEntry", PlanEntry._fields + ("index",))
+
+PLAN_FIELDS = list(PlanEntry._fields)
+
+
+def plan_format(path):
+    # 根据拓展名选择格式，默认为 JSONL
+    return "csv" if os.path.splitext(path)[1].lower() == ".csv" else "jsonl"
+
+
+class PlanWriter:
+    def __init__(self, path):
+        self.path = path
+        self.format = plan_format(path)
+        self.file = open(path, "w", encoding="utf-8", newline="")
+        self.csv_writer = None
+        if self.format == "csv":
+            self.csv_writer = csv.writer(self.file)
+            self.csv_writer.writerow(PLAN_FIELDS)
+
+    def write(self, entry):
+        if self.csv_writer is not None:
+            self.csv_writer.writerow(entry)
+        else:
+            self.file.write(json.dumps(entry._asdict(), ensure_ascii=False))
+            self.file.write("\n")
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def read_plan(path):
+    # 逐条读取计划，不一次性载入内存
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if plan_format(path) == "csv":
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header != PLAN_FIELDS:
+                raise ValueError(f"计划文件表头无效: {header}")
+            for row in reader:
+                if row:
+                    yield PlanEntry(row[0], row[1], row[2], int(row[3]))
+        else:
+            for line in f:
+                line = line.strip()
+                if line:
+                    data = json.loads(line)
+                    yield PlanEntry(data["source"], data["destination"], data.get("rule", ""),
+                                    int(data.get("size", 0)))
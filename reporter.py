@@ -0,0 +1,109 @@
+# reporter.py
+# 合并进度和状态消息：整理线程(及移动线程)只更新计数器，按固定频率向界面发送一次汇总，
+# 避免每个文件都发送跨线程信号、刷新界面
+
+import threading
+import time
+
+# 默认每秒最多发送 15 次
+DEFAULT_INTERVAL = 1 / 15
+# 结果中最多保留的错误消息数，超过后只计数
+MAX_ERROR_MESSAGES = 100
+
+
+class ProgressReporter:
+    # total 为None时表示总数未知(边遍历边整理)，只发送状态不发送进度
+    def __init__(self, total, emit_status, emit_progress, interval=DEFAULT_INTERVAL, clock=time.monotonic):
+        self.total = total
+        self.emit_status = emit_status
+        self.emit_progress = emit_progress
+        self.interval = interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.processed = 0
+        self.moved = 0
+        self.skipped = 0
+        self.errors = 0
+        self.bytes = 0
+        # 最近一条附加消息(错误、跨磁盘移动速度等)，随下一次汇总发送
+        self.last_message = ""
+        # 错误消息另外保存，同一发送间隔内的多条错误不会被后一条覆盖
+        self.error_messages = []
+        self.last_emit = None
+
+    def file_moved(self, size):
+        with self.lock:
+            self.processed += 1
+            self.moved += 1
+            self.bytes += size
+        self.tick()
+
+    def file_skipped(self):
+        with self.lock:
+            self.processed += 1
+            self.skipped += 1
+        self.tick()
+
+    def file_failed(self):
+        with self.lock:
+            self.processed += 1
+            self.errors += 1
+        self.tick()
+
+    def message(self, text):
+        with self.lock:
+            self.last_message = text
+        self.tick()
+
+    def error(self, text):
+        with self.lock:
+            self.last_message = text
+            if len(self.error_messages) < MAX_ERROR_MESSAGES:
+                self.error_messages.append(text)
+        self.tick()
+
+    def tick(self, force=False):
+        # 距上次发送超过间隔时才发送
+        now = self.clock()
+        with self.lock:
+            if not force and self.last_emit is not None and now - self.last_emit < self.interval:
+                return
+            self.last_emit = now
+            status = self.status_text()
+            if self.total is None:
+                progress = None
+            else:
+                progress = int(self.processed / self.total * 100) if self.total else 100
+        self.emit_status(status)
+        if progress is not None:
+            self.emit_progress(progress)
+
+    def status_text(self):
+        total = "" if self.total is None else f"/{self.total}"
+        text = (f"已处理 {self.processed}{total} 个文件，移动 {self.moved} 个，"
+                f"跳过 {self.skipped} 个，失败 {self.errors} 个，共 {self.bytes / (1024 * 1024):.1f} MB")
+        if self.last_message:
+            text += f"\n{self.last_message}"
+        return text
+
+    def counters(self):
+        with self.lock:
+            return {"total": self.total, "processed": self.processed, "moved": self.moved,
+                    "skipped": self.skipped, "errors": self.errors, "bytes": self.bytes,
+                    "error_messages": list(self.error_messages)}
+
+    def restore(self, counters):
+        # 从断点继续时恢复之前的计数
+        with self.lock:
+            self.processed = counters.get("processed", 0)
+            self.moved = counters.get("moved", 0)
+            self.skipped = counters.get("skipped", 0)
+            self.errors = counters.get("errors", 0)
+            self.bytes = counters.get("bytes", 0)
+            self.error_messages = list(counters.get("error_messages", []))[:MAX_ERROR_MESSAGES]
+
+    def summary(self):
+        # 最终汇总，不包含最近的附加消息
+        with self.lock:
+            return (f"移动 {self.moved} 个，跳过 {self.skipped} 个，失败 {self.errors} 个，"
+                    f"共 {self.bytes / (1024 * 1024):.1f} MB")
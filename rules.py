@@ -0,0 +1,347 @@
+# rules.py
+# 把 json 规则编译成不可变的判定流水线：阈值预先换算为字节，拓展名预先转成小写集合，
+# 整理时每个文件只需依次调用筛选器和分类器，不再查字典、解析字符串
+
+import os
+import re
+import time
+from collections import namedtuple
+
+from categories import OTHERS_FOLDER, CategoryRegistry
+from dates import exif_timestamp, filename_timestamp
+from matcher import KeywordMatcher
+from sniffer import ContentSniffer
+
+MB = 1024 * 1024
+
+TIME_FOLDER = '按时间分类的文件'
+# 日期分桶可用的日期来源，按顺序尝试
+DATE_SOURCES = ("mtime", "exif", "filename")
+# 分桶格式中精确到分钟以下的字段，含有这些字段时不缓存分桶结果
+FINE_TIME_FIELDS = re.compile(r"%[-#]?[MSfsTXcR]")
+# 缓存分桶结果的时间粒度(秒)，所有时区偏移和夏令时切换都是 15 分钟的整数倍
+BUCKET_SLOT = 900
+
+# 扫描阶段得到的文件记录，每个文件只 stat 一次，后续筛选和分类都复用这条记录
+FileRecord = namedtuple("FileRecord", ["name", "ext", "size", "mtime", "path", "ino"], defaults=(None, None))
+
+class SizePredicate:
+    # 大小判断，边界为字节数，None 表示不限
+    __slots__ = ("low", "high")
+
+    def __init__(self, low, high):
+        self.low = low
+        self.high = high
+
+    def __call__(self, record):
+        size = record.size
+        if self.low is not None and not size > self.low:
+            return False
+        if self.high is not None and not size < self.high:
+            return False
+        return True
+
+
+class TimePredicate:
+    # 修改时间判断，inclusive 为 True 时包含边界
+    __slots__ = ("start", "end", "inclusive")
+
+    def __init__(self, start, end, inclusive):
+        self.start = start
+        self.end = end
+        self.inclusive = inclusive
+
+    def __call__(self, record):
+        if self.inclusive:
+            return self.start <= record.mtime <= self.end
+        return self.start < record.mtime < self.end
+
+
+class NeverPredicate:
+    # 规则无效时使用，任何文件都不匹配
+    __slots__ = ()
+
+    def __call__(self, record):
+        return False
+
+
+class CustomClassifier:
+    # 自定义关键词分类，按关键词顺序返回第一个匹配项对应的文件夹
+    __slots__ = ("matcher", "folders")
+
+    def __init__(self, keywords):
+        self.matcher = KeywordMatcher(keywords)
+        self.folders = {item: custom_folder_name(item) for item in keywords}
+
+    def __call__(self, record):
+        keyword = self.matcher.match(record.name[:len(record.name) - len(record.ext)], record.ext)
+        if keyword is None:
+            return None
+        return self.folders[keyword]
+
+
+class PredicateClassifier:
+    # 满足条件时归入固定文件夹
+    __slots__ = ("predicate", "folder")
+
+    def __init__(self, predicate, folder):
+        self.predicate = predicate
+        self.folder = folder
+
+    def __call__(self, record):
+        if self.predicate(record):
+            return self.folder
+        return None
+
+
+class DateBucketClassifier:
+    # 按日期分桶，返回 "根文件夹/2024/05" 形式的文件夹；日期按 sources 顺序取第一个可用的
+    __slots__ = ("predicate", "folder", "format", "sources", "cache")
+
+    def __init__(self, predicate, folder, bucket_format, sources):
+        self.predicate = predicate
+        self.folder = folder
+        self.format = bucket_format.replace("/", os.sep)
+        self.sources = sources
+        # 15 分钟时间段 -> 文件夹，同一时间段内的文件不再重复格式化
+        self.cache = None if FINE_TIME_FIELDS.search(bucket_format) else {}
+
+    def timestamp(self, record):
+        for source in self.sources:
+            if source == "exif":
+                value = exif_timestamp(record.path, record.ext) if record.path else None
+            elif source == "filename":
+                value = filename_timestamp(record.name)
+            else:
+                value = record.mtime
+            if value is not None:
+                return value
+        return None
+
+    def __call__(self, record):
+        if self.predicate is not None and not self.predicate(record):
+            return None
+        timestamp = self.timestamp(record)
+        if timestamp is None:
+            return None
+        if self.cache is None:
+            return os.path.join(self.folder, time.strftime(self.format, time.localtime(timestamp)))
+        slot = int(timestamp // BUCKET_SLOT)
+        folder = self.cache.get(slot)
+        if folder is None:
+            if len(self.cache) >= 65536:
+                self.cache.clear()
+            folder = os.path.join(self.folder, time.strftime(self.format, time.localtime(slot * BUCKET_SLOT)))
+            self.cache[slot] = folder
+        return folder
+
+
+class DefaultClassifier:
+    # 预设分类，拓展名 -> 文件夹名 的字典查找；拓展名无法识别时可以按文件头判断
+    __slots__ = ("ext_map", "others", "sniffer", "sniff_map")
+
+    def __init__(self, ext_map, others, sniffer=None, sniff_map=None):
+        # ext_map 包含全部已知拓展名，未启用分类的拓展名对应None
+        self.ext_map = ext_map
+        self.others = others
+        # sniffer 返回分类键，sniff_map 为 分类键 -> 文件夹名(只包含启用的分类)
+        self.sniffer = sniffer
+        self.sniff_map = sniff_map or {}
+
+    def __call__(self, record):
+        folder = self.ext_map.get(record.ext.lower(), False)
+        if folder is not False:
+            return folder
+        if self.sniffer is not None:
+            category = self.sniffer(record)
+            if category is not None:
+                # 识别出的分类未启用时留在原处，不归入其他
+                return self.sniff_map.get(category)
+        return self.others
+
+
+class CompiledRules(namedtuple("CompiledRules", ["filters", "classifiers"])):
+    # filters: 筛选器元组；classifiers: (规则类型, 分类器) 元组，按优先级排列
+    __slots__ = ()
+
+    def accepts(self, record):
+        # 是否通过全部筛选规则
+        for predicate in self.filters:
+            if not predicate(record):
+                return False
+        return True
+
+    def plan(self, record):
+        # 返回 (规则类型, 目标文件夹名)，不需要移动时返回None
+        if not self.accepts(record):
+            return None
+        for rule_type, classifier in self.classifiers:
+            dest_folder_name = classifier(record)
+            if dest_folder_name:
+                return rule_type, dest_folder_name
+        return None
+
+    def plan_timed(self, record, observe):
+        # 与 plan 相同，同时把筛选和每个分类规则的耗时交给 observe(阶段, 秒)
+        clock = time.perf_counter
+        start = clock()
+        accepted = self.accepts(record)
+        now = clock()
+        observe("filter", now - start)
+        if not accepted:
+            return None
+        for rule_type, classifier in self.classifiers:
+            start = now
+            dest_folder_name = classifier(record)
+            now = clock()
+            observe("classify." + rule_type, now - start)
+            if dest_folder_name:
+                return rule_type, dest_folder_name
+        return None
+
+
+def custom_folder_name(keyword):
+    if keyword.startswith('.'):
+        return f'拓展名为{keyword}的文件'
+    return f'文件名中存在{keyword}的文件'
+
+
+def _check_numbers(*values):
+    for value in values:
+        if value is not None and not isinstance(value, (int, float)):
+            raise TypeError(f"'{value}' 不是数字")
+
+
+def _size_predicate(rule, convert):
+    model = rule.get("model")
+    value1 = rule.get("value1")
+    value2 = rule.get("value2")
+    if convert:
+        value1 = float(value1)
+        value2 = float(value2)
+    else:
+        _check_numbers(value1, value2)
+    if model == "大于":
+        return SizePredicate(value1 * MB, None)
+    elif model == "小于":
+        return SizePredicate(None, value2 * MB)
+    elif model == "介于":
+        return SizePredicate(value1 * MB, value2 * MB)
+    return NeverPredicate()
+
+
+def time_folder(rule):
+    # 按时间分类的文件夹，分桶时为各日期文件夹的上级
+    if rule.get("bucket"):
+        return rule.get("folder") or TIME_FOLDER
+    return TIME_FOLDER
+
+
+def _date_bucket_classifier(rule):
+    bucket_format = rule.get("bucket")
+    if not isinstance(bucket_format, str):
+        raise TypeError(f"'{bucket_format}' 不是日期格式")
+    # 格式无效时 strftime 会抛出 ValueError
+    time.strftime(bucket_format)
+    # 分桶文件夹必须位于分类文件夹之内，不能是绝对路径或包含 ".."
+    if bucket_format.startswith(("/", "\\")) or os.path.splitdrive(bucket_format)[0] \
+            or ".." in re.split(r"[/\\]", bucket_format):
+        raise ValueError(f"日期格式 '{bucket_format}' 指向分类文件夹之外")
+    sources = rule.get("date_source", "mtime")
+    if isinstance(sources, str):
+        sources = [sources]
+    for source in sources:
+        if source not in DATE_SOURCES:
+            raise ValueError(f"未知的日期来源 '{source}'")
+    # 可选的时间范围，只有两端都指定时才生效
+    start_time = rule.get("start_time")
+    end_time = rule.get("end_time")
+    predicate = None
+    if start_time and end_time:
+        _check_numbers(start_time, end_time)
+        predicate = TimePredicate(start_time, end_time, inclusive=False)
+    return DateBucketClassifier(predicate, time_folder(rule), bucket_format, tuple(sources))
+
+
+def compile_rules(rules, warn=None, categories=None):
+    # 编译规则，无效的规则值会通过 warn 回调报告一次，并编译为永不匹配；
+    # categories 为预设分类表，None 时按规则文件中的 "categories" 构建
+    def report(message):
+        if warn is not None:
+            warn(message)
+
+    if categories is None:
+        categories = CategoryRegistry.from_rules(rules, warn)
+
+    classification_rules = rules.get("classification_rule", {})
+    filter_rules = rules.get("filter_rule", {})
+
+    # 筛选规则，顺序与原先一致：先时间后大小
+    filters = []
+    time_filter = filter_rules.get("time", {})
+    if time_filter.get("enabled"):
+        start_time = time_filter.get("start_time")
+        end_time = time_filter.get("end_time")
+        if not start_time or not end_time:
+            filters.append(NeverPredicate())
+        else:
+            try:
+                # 提前检查时间值，避免整理时逐个文件出错
+                _check_numbers(start_time, end_time)
+                filters.append(TimePredicate(start_time, end_time, inclusive=True))
+            except TypeError as e:
+                report(f"按时间筛选时出错: 规则中的值无效 - {e}")
+                filters.append(NeverPredicate())
+    size_filter = filter_rules.get("size", {})
+    if size_filter.get("enabled"):
+        try:
+            filters.append(_size_predicate(size_filter, convert=True))
+        except (TypeError, ValueError) as e:
+            report(f"按大小筛选时出错: 规则中的值无效 - {e}")
+            filters.append(NeverPredicate())
+
+    # 分类规则，按优先级排列
+    classifiers = []
+    for rule_type in classification_rules.get("priority", []):
+        rule_details = classification_rules.get(rule_type, {})
+        if not rule_details.get("enabled"):
+            continue
+
+        if rule_type == "custom":
+            keywords = rule_details.get("keyword", [])
+            if keywords:
+                classifiers.append((rule_type, CustomClassifier(keywords)))
+        elif rule_type == "size":
+            try:
+                predicate = _size_predicate(rule_details, convert=False)
+            except (TypeError, ValueError) as e:
+                report(f"按大小分类时出错: 规则中的值无效 - {e}")
+                continue
+            classifiers.append((rule_type, PredicateClassifier(predicate, '按大小分类的文件')))
+        elif rule_type == "time" and rule_details.get("bucket"):
+            try:
+                classifiers.append((rule_type, _date_bucket_classifier(rule_details)))
+            except (TypeError, ValueError) as e:
+                report(f"按时间分类时出错: 规则中的值无效 - {e}")
+        elif rule_type == "time":
+            start_time = rule_details.get("start_time")
+            end_time = rule_details.get("end_time")
+            try:
+                # 提前检查时间值，避免整理时逐个文件出错
+                _check_numbers(start_time, end_time)
+                if start_time is None or end_time is None:
+                    raise TypeError("缺少开始或结束时间")
+            except TypeError as e:
+                report(f"按时间分类时出错: 规则中的值无效 - {e}")
+                continue
+            predicate = TimePredicate(start_time, end_time, inclusive=False)
+            classifiers.append((rule_type, PredicateClassifier(predicate, TIME_FOLDER)))
+        elif rule_type == "default":
+            sniff_map = dict(categories.enabled_folders(rule_details))
+            others = OTHERS_FOLDER if rule_details.get("others") else None
+            # sniff 为 True 时，拓展名无法识别的文件按文件头判断类型
+            sniffer = ContentSniffer() if rule_details.get("sniff") else None
+            classifiers.append((rule_type, DefaultClassifier(categories.ext_map(rule_details), others,
+                                                             sniffer, sniff_map)))
+
+    return CompiledRules(tuple(filters), tuple(classifiers))
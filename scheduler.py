@@ -0,0 +1,182 @@
+# scheduler.py
+# 批量整理：一次提交多个 (文件夹, 规则文件) 任务，由固定数量的线程执行。
+# 每个文件系统(按 st_dev 区分)同时运行的任务数有上限，慢速的网络存储排队时不会占满所有线程，
+# 本地磁盘上的任务可以越过它们先执行
+
+import os
+import threading
+import time
+from collections import namedtuple
+
+from organizer import Callback, FileOrganizer
+
+# target 为分类文件夹所在的根目录，None 时使用规则文件中的设置
+Job = namedtuple("Job", ["folder", "rules", "target"], defaults=(None,))
+
+
+def device_of(path):
+    # 路径所在的文件系统；路径不存在时向上查找已存在的上级文件夹
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except OSError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+
+class JobScheduler:
+    def __init__(self, jobs, workers=4, per_device=1, device_limits=None, organizer_options=None):
+        """
+        jobs: Job 列表
+        workers: 同时运行的任务数
+        per_device: 每个文件系统默认同时运行的任务数
+        device_limits: {路径: 上限}，为该路径所在的文件系统单独设置上限
+        organizer_options: 传给每个 FileOrganizer 的其他参数(dry_run、workers 等)
+        """
+        # 任务状态回调，参数为 (任务序号, 消息)
+        self.status_updated = Callback()
+        # 任务进度回调，参数为 (任务序号, 百分比)
+        self.progress_updated = Callback()
+        # 单个任务结束回调，参数为 (任务序号, 结果)，任务失败时结果为None
+        self.job_finished = Callback()
+        # 每个任务结束后发送当前的汇总(summary 的结果)
+        self.summary_updated = Callback()
+        # 全部任务结束回调
+        self.finished = Callback()
+
+        self.jobs = list(jobs)
+        self.workers = max(1, workers)
+        self.per_device = max(1, per_device)
+        self.device_limits = {}
+        for path, limit in (device_limits or {}).items():
+            device = device_of(path)
+            if device is not None:
+                self.device_limits[device] = max(1, int(limit))
+        self.organizer_options = organizer_options or {}
+
+        self.condition = threading.Condition()
+        # 等待执行的任务序号；文件系统 -> 正在运行的任务数
+        self.pending = list(range(len(self.jobs)))
+        self.running_per_device = {}
+        # 任务序号 -> 正在运行的 FileOrganizer
+        self.organizers = {}
+        self.results = [None] * len(self.jobs)
+        # 整理失败(结果为None)的任务序号；停止后未开始的任务序号
+        self.failed = set()
+        self.not_started = set()
+        # 各任务涉及的文件系统，开始执行前确定
+        self.devices = []
+        self.isRunning = True
+        self.start_time = None
+        self.elapsed = 0.0
+
+    def stop(self):
+        with self.condition:
+            self.isRunning = False
+            self.not_started.update(self.pending)
+            self.pending = []
+            for organizer in self.organizers.values():
+                organizer.stop()
+            self.condition.notify_all()
+
+    def run(self):
+        # 执行全部任务，返回时所有任务都已结束
+        self.start_time = time.perf_counter()
+        # 在加锁之前读取，网络存储上的 stat 较慢
+        self.devices = [self.job_devices(job) for job in self.jobs]
+        threads = [threading.Thread(target=self.worker, name=f"job-worker-{i}", daemon=True)
+                   for i in range(min(self.workers, len(self.jobs)))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.elapsed = time.perf_counter() - self.start_time
+        self.finished.emit()
+        return self.summary()
+
+    def limit(self, device):
+        return self.device_limits.get(device, self.per_device)
+
+    def job_devices(self, job):
+        # 任务涉及的文件系统：源文件夹和目标根目录
+        devices = {device_of(job.folder)}
+        if job.target:
+            devices.add(device_of(job.target))
+        devices.discard(None)
+        return devices
+
+    def next_job(self):
+        # 取出第一个所有相关文件系统都有空闲名额的任务；没有任务时返回None
+        with self.condition:
+            while self.isRunning and self.pending:
+                for position, index in enumerate(self.pending):
+                    devices = self.devices[index]
+                    if all(self.running_per_device.get(device, 0) < self.limit(device) for device in devices):
+                        del self.pending[position]
+                        for device in devices:
+                            self.running_per_device[device] = self.running_per_device.get(device, 0) + 1
+                        return index, devices
+                self.condition.wait()
+            return None
+
+    def worker(self):
+        while True:
+            picked = self.next_job()
+            if picked is None:
+                return
+            index, devices = picked
+            try:
+                self.run_job(index)
+            finally:
+                with self.condition:
+                    for device in devices:
+                        self.running_per_device[device] -= 1
+                    self.organizers.pop(index, None)
+                    self.condition.notify_all()
+
+    def run_job(self, index):
+        job = self.jobs[index]
+        organizer = FileOrganizer(job.folder, job.rules, target_root=job.target, **self.organizer_options)
+        organizer.status_updated.connect(lambda message: self.status_updated.emit(index, message))
+        organizer.progress_updated.connect(lambda value: self.progress_updated.emit(index, value))
+        with self.condition:
+            if not self.isRunning:
+                self.not_started.add(index)
+                return
+            self.organizers[index] = organizer
+        try:
+            organizer.organize()
+        except Exception as e:
+            self.status_updated.emit(index, f"整理过程发生错误: \n{e}")
+        self.results[index] = organizer.result
+        if organizer.result is None:
+            with self.condition:
+                self.failed.add(index)
+        self.job_finished.emit(index, organizer.result)
+        self.summary_updated.emit(self.summary())
+
+    def summary(self):
+        # 各任务的结果和总吞吐量
+        total = {"processed": 0, "moved": 0, "skipped": 0, "errors": 0, "bytes": 0}
+        done = 0
+        for result in list(self.results):
+            if result is None:
+                continue
+            done += 1
+            for key in total:
+                total[key] += result.get(key, 0)
+        elapsed = self.elapsed or (time.perf_counter() - self.start_time if self.start_time else 0.0)
+        total.update({
+            "jobs": len(self.jobs),
+            "done_jobs": done,
+            "failed_jobs": len(self.failed),
+            "not_started_jobs": len(self.not_started),
+            "elapsed": round(elapsed, 3),
+            "files_per_second": round(total["processed"] / elapsed, 1) if elapsed > 0 else 0.0,
+            "mb_per_second": round(total["bytes"] / (1024 * 1024) / elapsed, 2) if elapsed > 0 else 0.0,
+            "stopped": not self.isRunning,
+        })
+        return total
@@ -0,0 +1,111 @@
+# sniffer.py
+# 按文件头识别内容类型：每个文件只读取开头 HEAD_SIZE 字节(一次 pread，复用线程内的缓冲区)，
+# 与常见图片、视频、文档格式的特征字节比较。用于没有拓展名或拓展名无法识别的文件
+
+import os
+import threading
+
+HEAD_SIZE = 512
+
+# (偏移, 特征字节, 分类)，按顺序匹配
+SIGNATURES = (
+    (0, b"\xff\xd8\xff", "images"),
+    (0, b"\x89PNG\r\n\x1a\n", "images"),
+    (0, b"GIF87a", "images"),
+    (0, b"GIF89a", "images"),
+    (0, b"II*\x00", "images"),
+    (0, b"MM\x00*", "images"),
+    (0, b"\x1aE\xdf\xa3", "videos"),
+    (0, b"0&\xb2u\x8ef\xcf\x11", "videos"),
+    (0, b"FLV\x01", "videos"),
+    (0, b"\x00\x00\x01\xba", "videos"),
+    (0, b"%PDF-", "documents"),
+    (0, b"{\\rtf", "documents"),
+    (0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "documents"),
+)
+
+# ISO 基本媒体格式(偏移 4 处为 ftyp)中属于图片的品牌，其余视为视频
+IMAGE_BRANDS = (b"heic", b"heix", b"mif1", b"msf1", b"avif")
+
+# Office Open XML(docx/xlsx/pptx)压缩包中第一个文件的名称
+OFFICE_ENTRIES = (b"[Content_Types].xml", b"_rels/", b"docProps/", b"word/", b"xl/", b"ppt/")
+
+_local = threading.local()
+
+
+def _buffer():
+    buffer = getattr(_local, "buffer", None)
+    if buffer is None:
+        buffer = _local.buffer = bytearray(HEAD_SIZE)
+    return buffer
+
+
+def read_head(path):
+    # 返回 (缓冲区, 有效长度)，缓冲区在同一线程内复用，下次调用前有效
+    fd = os.open(path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    try:
+        if hasattr(os, "preadv"):
+            buffer = _buffer()
+            return buffer, os.preadv(fd, [buffer], 0)
+        # Windows 上没有 preadv
+        data = os.read(fd, HEAD_SIZE)
+        return data, len(data)
+    finally:
+        os.close(fd)
+
+
+def sniff_bytes(head, length):
+    # 根据文件头返回分类(images/videos/documents)，无法识别时返回None
+    for offset, magic, category in SIGNATURES:
+        if head.startswith(magic, offset, length):
+            return category
+    if head.startswith(b"BM", 0, length) and length >= 10 and not any(head[6:10]):
+        # BMP 只有两个特征字节，再检查必须为 0 的保留字段
+        return "images"
+    if head.startswith(b"RIFF", 0, length):
+        if head.startswith(b"WEBP", 8, length):
+            return "images"
+        if head.startswith(b"AVI ", 8, length):
+            return "videos"
+        return None
+    if head.startswith(b"ftyp", 4, length):
+        for brand in IMAGE_BRANDS:
+            if head.startswith(brand, 8, length):
+                return "images"
+        return "videos"
+    if head.startswith(b"PK\x03\x04", 0, length) and length >= 30:
+        # 本地文件头中第一个文件名的长度位于偏移 26
+        name_length = head[26] | head[27] << 8
+        name = bytes(head[30:min(30 + name_length, length)])
+        if name.startswith(OFFICE_ENTRIES):
+            return "documents"
+        return None
+    text = bytes(head[:length]).lstrip(b"\xef\xbb\xbf \t\r\n")
+    if text.startswith(b"<svg") or (text.startswith((b"<?xml", b"<!DOCTYPE svg")) and b"<svg" in text):
+        return "images"
+    return None
+
+
+class ContentSniffer:
+    # 识别结果按 (inode, 修改时间) 缓存，监视模式或界面中重复整理时不再读取
+    __slots__ = ("cache", "cache_size")
+
+    def __init__(self, cache_size=65536):
+        self.cache = {}
+        self.cache_size = cache_size
+
+    def __call__(self, record):
+        if not record.path:
+            return None
+        key = (record.ino, record.mtime) if record.ino else None
+        if key is not None and key in self.cache:
+            return self.cache[key]
+        try:
+            category = sniff_bytes(*read_head(record.path))
+        except OSError:
+            return None
+        if key is not None:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            self.cache[key] = category
+        return category
@@ -0,0 +1,79 @@
+# test_checkpoint.py
+# 断点续传：整理中途停止后再次整理，所有文件都应被整理，且不会有文件被当作已处理而遗漏
+# 用法: python -m unittest discover -s tests
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from organizer import FileOrganizer  # noqa: E402
+
+RULES = {
+    "classification_rule": {"priority": ["default"],
+                            "default": {"enabled": True, "images": True, "videos": True, "documents": True,
+                                        "others": True}},
+    "scan": {"recursive": True, "max_depth": None},
+}
+
+
+class StoppingOrganizer(FileOrganizer):
+    # 第 stop_at 次移动开始时停止整理
+    def __init__(self, *args, stop_at=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stop_at = stop_at
+        self.calls = 0
+        # 每次规划下一个文件前都可以保存断点
+        self.checkpoint_interval = 0
+
+    def move_entry(self, entry):
+        self.calls += 1
+        if self.calls == self.stop_at:
+            self.stop()
+        return super().move_entry(entry)
+
+
+class StopThenResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.folder = os.path.join(self.base, "inbox")
+        for sub in range(5):
+            os.makedirs(os.path.join(self.folder, f"s{sub}"))
+            for index in range(20):
+                open(os.path.join(self.folder, f"s{sub}", f"f{index}.jpg"), "w").close()
+        self.rules_path = os.path.join(self.base, "rules.json")
+        with open(self.rules_path, "w", encoding="utf-8") as f:
+            json.dump(RULES, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.base, ignore_errors=True)
+
+    def remaining(self):
+        # 还留在源子文件夹中的文件
+        return [name for sub in range(5) for name in os.listdir(os.path.join(self.folder, f"s{sub}"))]
+
+    def run_stop_then_resume(self, workers):
+        first = StoppingOrganizer(self.folder, self.rules_path, workers=workers, checkpoint=True, stop_at=37)
+        first.organize()
+        self.assertTrue(first.result["stopped"])
+        self.assertTrue(self.remaining())
+
+        second = FileOrganizer(self.folder, self.rules_path, workers=workers, checkpoint=True)
+        second.organize()
+        self.assertFalse(second.result["stopped"])
+        self.assertEqual(self.remaining(), [])
+        self.assertEqual(len(os.listdir(os.path.join(self.folder, "图片"))), 100)
+
+    def test_sequential(self):
+        self.run_stop_then_resume(workers=1)
+
+    def test_workers(self):
+        self.run_stop_then_resume(workers=4)
+
+
+if __name__ == "__main__":
+    unittest.main()
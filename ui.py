@@ -3,13 +3,38 @@ import json
 import os
 from pydoc import describe
 
-from PySide6.QtCore import Qt, Signal, QThread, QDate, QDateTime, QTime
+from PySide6.QtCore import Qt, Signal, QThread, QDate, QDateTime, QTime, QObject
 from PySide6.QtGui import QIntValidator
 from PySide6.QtWidgets import QLabel, QLineEdit, QMessageBox, QPushButton, QVBoxLayout, QHBoxLayout, QDialog, \
     QFileDialog, QWidget, QProgressBar, QTabWidget, QGroupBox, QCheckBox, QDateEdit, QComboBox, QTextEdit, QSizePolicy
 from organizer import FileOrganizer
 
 
+class OrganizerWorker(QObject):
+    # 把 FileOrganizer 的回调转发为 Qt 信号，信号跨线程发送到界面线程
+    status_updated = Signal(str)
+    progress_updated = Signal(int)
+    finished = Signal()
+
+    def __init__(self, organizer, watch=False):
+        super().__init__()
+        self.organizer = organizer
+        # 是否以监视模式运行
+        self.watch = watch
+        organizer.status_updated.connect(self.status_updated.emit)
+        organizer.progress_updated.connect(self.progress_updated.emit)
+        organizer.finished.connect(self.finished.emit)
+
+    def run(self):
+        if self.watch:
+            self.organizer.watch()
+        else:
+            self.organizer.organize()
+
+    def stop(self):
+        self.organizer.stop()
+
+
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
@@ -21,6 +46,8 @@ class MainWindow(QWidget):
         self.advanced_settings_window = None
         self.worker_thread = None
         self.organizer = None
+        self.worker = None
+        self.watching = False
 
         # 整体布局
         whole_layout = QVBoxLayout()
@@ -73,6 +100,9 @@ class MainWindow(QWidget):
         # 开始按钮
         self.start_button = QPushButton('开始整理', self)
         self.start_button.setEnabled(False)  # 初始时禁用，选择文件夹后启用
+        # 监视按钮，开始后再次点击停止监视
+        self.watch_button = QPushButton('持续监视', self)
+        self.watch_button.setEnabled(False)
 
         # 进度显示
         self.status_label = QLabel("请先选择一个文件夹...", self)
@@ -87,6 +117,7 @@ class MainWindow(QWidget):
         whole_layout.addLayout(custom_layout)
         whole_layout.addStretch(1)
         whole_layout.addWidget(self.start_button)
+        whole_layout.addWidget(self.watch_button)
         whole_layout.addStretch(1)
         whole_layout.addWidget(QLabel("整理状态:"))
         whole_layout.addWidget(self.status_label)
@@ -96,6 +127,7 @@ class MainWindow(QWidget):
         self.select_dir_button.clicked.connect(self.getDir)
         self.custom_button.clicked.connect(self.open_advanced_settings)
         self.start_button.clicked.connect(self.start_organization)
+        self.watch_button.clicked.connect(self.toggle_watch)
 
     def getDir(self):
         # 获取路径和更新UI
@@ -104,39 +136,57 @@ class MainWindow(QWidget):
             self.filepath = dir_path
             self.selected_path_label.setText(f"已选择: {self.filepath}")
             self.start_button.setEnabled(True)  # 启用开始按钮
+            self.watch_button.setEnabled(True)
             self.status_label.setText("准备就绪，可以开始整理。")
             self.progress_bar.setValue(0)
 
     def start_organization(self):
+        self.start_worker(watch=False)
+
+    # 开始或停止监视
+    def toggle_watch(self):
+        if self.watching:
+            self.watch_button.setEnabled(False)
+            self.organizer.stop()
+            return
+        self.start_worker(watch=True)
+
+    def start_worker(self, watch):
         if not self.filepath:
             QMessageBox.warning(self, "警告", "请先选择一个要整理的文件夹！")
             return
 
-        # 禁用按钮，防止重复点击
+        # 禁用按钮，防止重复点击；监视时保留监视按钮用于停止
         self.start_button.setEnabled(False)
         self.select_dir_button.setEnabled(False)
         self.custom_button.setEnabled(False)
+        self.watching = watch
+        if watch:
+            self.watch_button.setText('停止监视')
+        else:
+            self.watch_button.setEnabled(False)
 
         # 创建 QThread 和 FileOrganizer 实例
         self.worker_thread = QThread()
         config_path = os.path.join(os.getcwd(), "config.json")
         self.organizer = FileOrganizer(self.filepath, config_path)
+        self.worker = OrganizerWorker(self.organizer, watch=watch)
 
-        # 将 organizer移动到新线程中
-        self.organizer.moveToThread(self.worker_thread)
+        # 将 worker 移动到新线程中
+        self.worker.moveToThread(self.worker_thread)
 
         # 连接信号和槽
         # 当线程启动时，执行 organizer.organize 方法
-        self.worker_thread.started.connect(self.organizer.organize)
+        self.worker_thread.started.connect(self.worker.run)
 
-        # 连接 organizer 的信号到 MainWindow 的槽函数，以更新UI
-        self.organizer.progress_updated.connect(self.update_progress)
-        self.organizer.status_updated.connect(self.update_status)
-        self.organizer.finished.connect(self.on_finished)
+        # 连接 worker 的信号到 MainWindow 的槽函数，以更新UI
+        self.worker.progress_updated.connect(self.update_progress)
+        self.worker.status_updated.connect(self.update_status)
+        self.worker.finished.connect(self.on_finished)
 
         # 当任务完成时，退出并清理线程
-        self.organizer.finished.connect(self.worker_thread.quit)
-        self.organizer.finished.connect(self.organizer.deleteLater)
+        self.worker.finished.connect(self.worker_thread.quit)
+        self.worker.finished.connect(self.worker.deleteLater)
         self.worker_thread.finished.connect(self.worker_thread.deleteLater)
 
         # 启动线程
@@ -156,10 +206,14 @@ class MainWindow(QWidget):
         self.start_button.setEnabled(True)
         self.select_dir_button.setEnabled(True)
         self.custom_button.setEnabled(True)
+        self.watch_button.setEnabled(True)
+        self.watch_button.setText('持续监视')
+        watching = self.watching
+        self.watching = False
 
         # 弹出提示
         if "错误" not in self.status_label.text():
-            QMessageBox.information(self, '提示', '文件整理完成！')
+            QMessageBox.information(self, '提示', '已停止监视。' if watching else '文件整理完成！')
         else:
             QMessageBox.critical(self, '错误', self.status_label.text())
 
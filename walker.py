@@ -0,0 +1,154 @@
+# walker.py
+# 流式遍历文件夹：用显式栈代替递归，边遍历边产出文件记录，内存只与待遍历的文件夹数量有关，
+# 整理可以在遍历结束之前就开始移动文件
+
+import fnmatch
+import os
+import re
+import time
+
+from checkpoint import dir_position
+from rules import FileRecord
+
+
+def compile_globs(patterns):
+    # 把多个通配符合并为一个正则，返回匹配函数；没有通配符时返回None
+    if not patterns:
+        return None
+    regex = re.compile("|".join(fnmatch.translate(os.path.normcase(pattern)) for pattern in patterns))
+    return lambda name: regex.match(os.path.normcase(name)) is not None
+
+
+def dir_key(path):
+    # 用于比较文件夹是否相同
+    return os.path.normcase(os.path.abspath(path))
+
+
+def walk_files(root, max_depth=0, include=None, exclude=None, skip_dirs=(), ordered=False, resume_after=None,
+               index=None, metrics=None):
+    """
+    产出 root 下的文件记录
+        max_depth: 向下进入子文件夹的层数，0 表示只处理 root 本身，None 表示不限
+        include: 文件名通配符列表，指定时只产出匹配的文件
+        exclude: 通配符列表，匹配的文件和文件夹都会跳过
+        skip_dirs: 需要跳过的文件夹路径(例如分类文件夹)
+        ordered: 每个文件夹内按文件名排序，遍历顺序固定，断点续传时使用
+        resume_after: checkpoint.file_position 得到的位置，只产出该位置之后的文件(需要 ordered)
+        index: index.DirectoryIndex，增量整理时跳过未变化的文件夹和文件
+        metrics: metrics.StageMetrics，记录打开文件夹(opendir)、读取目录项(list)和 stat 的耗时
+    """
+    include_match = compile_globs(include)
+    exclude_match = compile_globs(exclude)
+    skip_keys = {dir_key(path) for path in skip_dirs}
+
+    # (路径, 深度, 相对 root 的各级文件夹名, 是否需要与断点位置比较)
+    stack = [(root, 0, (), resume_after is not None)]
+    while stack:
+        current, depth, parts, check = stack.pop()
+        subdirs = []
+        files = []
+        known = None
+        if index is not None:
+            try:
+                dir_mtime = os.stat(current).st_mtime_ns
+            except OSError:
+                continue
+            subdirs = index.unchanged_subdirs(current, dir_mtime)
+            if subdirs is not None:
+                # 文件夹未变化，不列出内容，只进入记录的子文件夹
+                _push_subdirs(stack, current, depth, parts, check, sorted(subdirs) if ordered else subdirs,
+                              max_depth, exclude_match, skip_keys, resume_after)
+                continue
+            subdirs = []
+            known = index.begin_dir(current, dir_mtime)
+
+        try:
+            if metrics is not None:
+                with metrics.time("opendir"):
+                    entries = os.scandir(current)
+            else:
+                entries = os.scandir(current)
+        except OSError:
+            # 文件夹无权限访问或已被删除
+            continue
+        with entries:
+            for entry in (entries if metrics is None else metrics.timed_iter("list", entries)):
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                name = entry.name
+                if exclude_match is not None and exclude_match(name):
+                    continue
+                if include_match is not None and not include_match(name):
+                    continue
+                if ordered:
+                    # 需要排序时先收集本文件夹的文件
+                    files.append(entry)
+                    continue
+                record = _record(entry, known, index, current, metrics)
+                if record is not None:
+                    yield record
+
+        if ordered:
+            files.sort(key=lambda entry: entry.name)
+            subdirs.sort()
+            position = dir_position(parts) if check else None
+            for entry in files:
+                if check and position + [[0, entry.name]] <= resume_after:
+                    continue
+                record = _record(entry, known, index, current, metrics)
+                if record is not None:
+                    yield record
+
+        if index is not None:
+            index.end_dir(current, subdirs)
+        _push_subdirs(stack, current, depth, parts, check, subdirs, max_depth, exclude_match, skip_keys,
+                      resume_after)
+
+
+def _push_subdirs(stack, current, depth, parts, check, subdirs, max_depth, exclude_match, skip_keys, resume_after):
+    if max_depth is not None and depth >= max_depth:
+        return
+    # 逆序入栈，保证按扫描顺序遍历子文件夹
+    for name in reversed(subdirs):
+        path = os.path.join(current, name)
+        if dir_key(path) in skip_keys:
+            continue
+        if exclude_match is not None and exclude_match(name):
+            continue
+        sub_check = False
+        if check:
+            sub_position = dir_position(parts + (name,))
+            if resume_after[:len(sub_position)] == sub_position:
+                # 断点位于该子文件夹中
+                sub_check = True
+            elif sub_position < resume_after:
+                # 整个子文件夹都已处理过
+                continue
+        stack.append((path, depth + 1, parts + (name,), sub_check))
+
+
+def _record(entry, known=None, index=None, directory=None, metrics=None):
+    try:
+        if metrics is not None:
+            start = time.perf_counter()
+            stat = entry.stat()
+            metrics.observe("stat", time.perf_counter() - start)
+        else:
+            stat = entry.stat()
+    except OSError:
+        # 文件在扫描过程中被删除或无权限访问，直接跳过
+        return None
+    name = entry.name
+    if known:
+        key = known.get(name)
+        if key is not None and key == (stat.st_ino, stat.st_size, stat.st_mtime):
+            # 上次整理后没有变化，仍然留在原处
+            index.keep(directory, name, stat.st_ino, stat.st_size, stat.st_mtime)
+            return None
+    return FileRecord(name, os.path.splitext(name)[1], stat.st_size, stat.st_mtime, entry.path, stat.st_ino)
@@ -0,0 +1,219 @@
+# watcher.py
+# 监视模式：用 inotify 订阅文件夹中的新文件(不可用时退化为定期扫描)，
+# 仍在写入的文件等到大小和修改时间稳定后再交给整理流程
+
+import ctypes
+import ctypes.util
+import heapq
+import os
+import select
+import stat
+import struct
+import time
+
+from rules import FileRecord
+
+# inotify 事件掩码，见 <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# 只关心文件写完(关闭)、移入和新建；不订阅 IN_MODIFY，大文件写入时不会产生大量事件
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_ONLYDIR
+
+EVENT_HEADER = struct.Struct("iIII")
+
+# 事件队列溢出时返回的路径，需要重新扫描所有监视的文件夹
+RESCAN = None
+
+
+class InotifyWatcher:
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        # 非 Linux 系统上没有这两个函数，会抛出 AttributeError
+        self.add_watch = libc.inotify_add_watch
+        self.add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self.fd = fd
+        # 监视描述符 -> 文件夹路径
+        self.paths = {}
+
+    def add(self, path):
+        wd = self.add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            # 文件夹已被删除或超过 max_user_watches 限制
+            return False
+        self.paths[wd] = path
+        return True
+
+    def read(self, timeout):
+        # 等待最多 timeout 秒，返回 [(路径, 是否为文件夹, 是否已写完)]
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                events.append((RESCAN, False, False))
+                continue
+            if mask & IN_IGNORED:
+                # 文件夹被删除或移走，监视已被内核移除
+                self.paths.pop(wd, None)
+                continue
+            directory = self.paths.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            events.append((path, bool(mask & IN_ISDIR), bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO))))
+        return events
+
+    def watched(self):
+        return list(self.paths.values())
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    # 没有 inotify 时(Windows、macOS 或网络文件系统)定期扫描监视的文件夹，对比前后两次的结果
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.next_poll = time.monotonic() + interval
+        # 文件夹路径 -> {名称: (是否为文件夹, 大小, 修改时间)}
+        self.snapshots = {}
+
+    def add(self, path):
+        snapshot = self.snapshot(path)
+        if snapshot is None:
+            return False
+        self.snapshots[path] = snapshot
+        return True
+
+    @staticmethod
+    def snapshot(path):
+        result = {}
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            result[entry.name] = (True, 0, 0)
+                        elif entry.is_file():
+                            file_stat = entry.stat()
+                            result[entry.name] = (False, file_stat.st_size, file_stat.st_mtime_ns)
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        return result
+
+    def read(self, timeout):
+        now = time.monotonic()
+        if now < self.next_poll:
+            time.sleep(min(timeout, self.next_poll - now))
+            if time.monotonic() < self.next_poll:
+                return []
+        self.next_poll = time.monotonic() + self.interval
+        events = []
+        for directory, previous in list(self.snapshots.items()):
+            current = self.snapshot(directory)
+            if current is None:
+                del self.snapshots[directory]
+                continue
+            self.snapshots[directory] = current
+            for name, info in current.items():
+                if previous.get(name) != info:
+                    events.append((os.path.join(directory, name), info[0], False))
+        return events
+
+    def watched(self):
+        return list(self.snapshots)
+
+    def close(self):
+        self.snapshots = {}
+
+
+def make_watcher(poll_interval=1.0):
+    # 优先使用 inotify，不可用时退化为定期扫描
+    try:
+        return InotifyWatcher()
+    except (OSError, AttributeError, TypeError):
+        return PollingWatcher(poll_interval)
+
+
+class SettleQueue:
+    """
+    等待写入完成的文件
+        已写完(关闭或移入)的文件立即就绪；其余文件在 settle 秒后检查一次，
+        修改时间已超过 settle 秒或与上次检查时相同则就绪，否则继续等待
+    """
+    def __init__(self, settle):
+        self.settle = settle
+        # 路径 -> (检查时间, 上次检查时的 (大小, 修改时间), 是否已写完)
+        self.pending = {}
+        self.heap = []
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, path, complete, now):
+        previous = self.pending.get(path)
+        signature = previous[1] if previous is not None else None
+        self._schedule(path, now if complete else now + self.settle, signature, complete)
+
+    def _schedule(self, path, deadline, signature, complete):
+        self.pending[path] = (deadline, signature, complete)
+        heapq.heappush(self.heap, (deadline, path))
+
+    def timeout(self, now, maximum):
+        # 距离下一个文件需要检查的时间，用作等待事件的超时
+        if not self.heap:
+            return maximum
+        return min(max(self.heap[0][0] - now, 0.0), maximum)
+
+    def ready(self, now):
+        records = []
+        while self.heap and self.heap[0][0] <= now:
+            deadline, path = heapq.heappop(self.heap)
+            entry = self.pending.get(path)
+            if entry is None or entry[0] != deadline:
+                # 之后又有新的事件，以新的检查时间为准
+                continue
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                # 文件已被删除或移走
+                del self.pending[path]
+                continue
+            if not stat.S_ISREG(file_stat.st_mode):
+                del self.pending[path]
+                continue
+            signature = (file_stat.st_size, file_stat.st_mtime_ns)
+            _, previous, complete = entry
+            if not complete and signature != previous and time.time() - file_stat.st_mtime < self.settle:
+                # 仍在写入
+                self._schedule(path, now + self.settle, signature, False)
+                continue
+            del self.pending[path]
+            name = os.path.basename(path)
+            records.append(FileRecord(name, os.path.splitext(name)[1], file_stat.st_size, file_stat.st_mtime,
+                                      path, file_stat.st_ino))
+        return records